@@ -0,0 +1,35 @@
+# path: src/atomic_io.py
+"""
+Publish files atomically: write to a temp file beside the target, then os.replace() it into
+place, so readers (serve_forecasts.py, the dashboard, other worker processes) never see a
+half-written file. The temp name carries the pid, so concurrent writers do not collide; a
+failed write leaves the previous file untouched and removes the temp file.
+
+Usage:
+    from atomic_io import atomic_path, write_json
+    with atomic_path("data/forecasts/Maharashtra_forecast.csv") as tmp:
+        frame.to_csv(tmp, index=False)
+    write_json({"ok": True}, "data/forecasts/run_summary.json", indent=2)
+"""
+import json
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+
+@contextmanager
+def atomic_path(path: str) -> Iterator[str]:
+    """Yield a temp path to write; it replaces `path` when the block finishes without error."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def write_json(obj, path: str, **kwargs):
+    with atomic_path(path) as tmp:
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(obj, fh, **kwargs)
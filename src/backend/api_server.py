@@ -9,6 +9,11 @@ Endpoints:
  - GET /api/table          -> full per-state table JSON
  - GET /api/top10?metric=availability|extraction|stage
  - GET /api/forecast?state=...&metric=availability|extraction|stage&periods=5&base_year=2024&mode=compound&rate=-0.01
+   stage is not projected on its own: it is derived as extraction / availability x 100 (model.derive_stage)
+   from the availability and extraction projections, set with availability_rate / extraction_rate
+   (or availability_delta / extraction_delta in linear mode; unset means no change). rate / delta
+   used to be changes of the stage itself, so they are rejected for metric=stage rather than
+   reinterpreted; the response echoes the per-input parameters that were used.
 
 Usage:
   1) Ingest CSV into DB (once or when CSV updates):
@@ -22,12 +27,20 @@ import os
 import math
 import logging
 import sqlite3
+import sys
 from typing import Dict, Any
 
 import pandas as pd
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 
+try:
+    from model import derive_stage
+except ImportError:
+    # model.py lives in src/; make it importable when this server runs from src/backend
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")))
+    from model import derive_stage
+
 app = Flask(__name__)
 CORS(app)
 logging.basicConfig(level=logging.INFO)
@@ -61,6 +74,19 @@ def scenario_forecast_single_value(value: float, periods: int, mode: str, rate:
     return series
 
 
+def derive_stage_series(availability, extraction):
+    """Stage of extraction (%) per offset from matching availability/extraction projections."""
+    stage = derive_stage([a for _, a in availability], [e for _, e in extraction])
+    return [(offset, float(s)) for (offset, _), s in zip(availability, stage)]
+
+
+def _float_arg(name: str, default: float) -> float:
+    try:
+        return float(request.args.get(name, default))
+    except Exception:
+        return default
+
+
 @app.route("/health")
 def health():
     ok = os.path.isfile(DB_PATH)
@@ -160,6 +186,9 @@ def api_forecast():
     mode = request.args.get("mode", "compound")
     if mode not in ("compound", "linear"):
         mode = "compound"
+    if metric == "stage" and ("rate" in request.args or "delta" in request.args):
+        return jsonify({"error": "rate/delta do not apply to metric=stage, which is derived from availability and "
+                                 "extraction: use availability_rate/extraction_rate (or the _delta variants)."}), 400
     try:
         rate = float(request.args.get("rate", 0.0))
     except Exception:
@@ -175,8 +204,10 @@ def api_forecast():
         logging.exception("Failed to read DB")
         return jsonify({"error": str(e)}), 500
 
+    # stage is derived from the two base metrics, so those are the values we project
+    base_metrics = ["availability", "extraction"] if metric == "stage" else [metric]
     if state and state.strip().lower() in ("all states", "all states (aggregate)", "all_states_aggregate", "all_states"):
-        base_val = float(df[metric].sum(skipna=True)) if not df[metric].dropna().empty else None
+        base_vals = {m: float(df[m].sum(skipna=True)) if not df[m].dropna().empty else None for m in base_metrics}
         label = "All States (Aggregate)"
     else:
         matches = df[df["state"].str.lower() == state.lower()]
@@ -185,21 +216,33 @@ def api_forecast():
             matches = df[mask]
         if matches.empty:
             return jsonify({"error": f"No data for state '{state}'. Try /api/states"}), 404
-        base_val = float(matches.iloc[0][metric]) if not pd.isna(matches.iloc[0][metric]) else None
+        base_vals = {m: float(matches.iloc[0][m]) if not pd.isna(matches.iloc[0][m]) else None for m in base_metrics}
         label = str(matches.iloc[0]["state"])
 
-    if base_val is None or (isinstance(base_val, float) and math.isnan(base_val)):
-        return jsonify({"error": f"No numeric base value for metric '{metric}' for '{label}'"}), 400
-
-    series = scenario_forecast_single_value(base_val, periods, mode, rate=rate, delta=delta)
+    for m, base_val in base_vals.items():
+        if base_val is None or (isinstance(base_val, float) and math.isnan(base_val)):
+            return jsonify({"error": f"No numeric base value for metric '{m}' for '{label}'"}), 400
+
+    scenario = {"rate": rate, "delta": delta}
+    if metric == "stage":
+        scenario = {f"{m}_{p}": _float_arg(f"{m}_{p}", 0.0) for m in base_metrics for p in ("rate", "delta")}
+        projections = {
+            m: scenario_forecast_single_value(base_vals[m], periods, mode, rate=scenario[f"{m}_rate"],
+                                              delta=scenario[f"{m}_delta"])
+            for m in base_metrics
+        }
+        series = derive_stage_series(projections["availability"], projections["extraction"])
+    else:
+        series = scenario_forecast_single_value(base_vals[metric], periods, mode, rate=rate, delta=delta)
     history = []
     forecast = []
     for offset, v in series:
         year = int(base_year + offset)
+        value = None if math.isnan(v) else float(v)
         if offset == 0:
-            history.append({"year": year, "value": float(v)})
+            history.append({"year": year, "value": value})
         else:
-            forecast.append({"year": year, "value": float(v)})
+            forecast.append({"year": year, "value": value})
 
     return jsonify({
         "state": label,
@@ -208,8 +251,7 @@ def api_forecast():
         "history": history,
         "forecast": forecast,
         "mode": mode,
-        "rate": rate,
-        "delta": delta
+        **scenario,
     })
 
 
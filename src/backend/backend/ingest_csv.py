@@ -4,6 +4,8 @@ Ingest the provided groundwater snapshot CSV into a lightweight SQLite database.
 
 Usage:
   python src/ingest_csv.py --input data/raw/ea156058-114e-48d4-b70a-7f266536d94f.csv --db data/groundwater.db
+  # also precompute the served forecasts from the cleaned time series (see warm_cache.py)
+  python src/ingest_csv.py --input data/raw/ea156058-114e-48d4-b70a-7f266536d94f.csv --db data/groundwater.db --warm
 
 What it does:
  - Reads the CSV provided by you
@@ -11,6 +13,8 @@ What it does:
  - Normalizes them to columns: state, availability, extraction, stage
  - Writes a 'states' table into the given SQLite DB (replaces if exists)
  - Also writes a 'raw_snapshot' table with the original CSV (for debugging)
+ - With --warm, runs the forecast warm-up on the cleaned yearly CSV (the snapshot itself has no
+   history to forecast from)
 """
 import argparse
 import os
@@ -111,12 +115,35 @@ def ingest(input_csv: str, db_path: str):
         conn.close()
 
 
+def run_warm_up(clean_csv: str, out_dir: str, periods: int):
+    if not os.path.isfile(clean_csv):
+        print(f"Skipping warm-up, cleaned CSV not found: {clean_csv}", file=sys.stderr)
+        return
+    try:
+        from warm_cache import warm
+    except ImportError:
+        # warm_cache.py lives in src/; make it importable when this script runs from a subfolder
+        here = os.path.dirname(os.path.abspath(__file__))
+        sys.path.insert(0, os.path.abspath(os.path.join(here, "..", "..")))
+        from warm_cache import warm
+    import logging
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    print("Warm-up:", warm(clean_csv, out_dir=out_dir, periods=periods))
+
+
 def main():
     p = argparse.ArgumentParser(description="Ingest groundwater snapshot CSV into SQLite DB")
     p.add_argument("--input", required=True, help="Path to the snapshot CSV")
     p.add_argument("--db", default="data/groundwater.db", help="Path to SQLite DB to write")
+    p.add_argument("--warm", action="store_true", help="Precompute served forecasts after ingesting")
+    p.add_argument("--clean", default="data/processed/cleaned_groundwater.csv", help="With --warm: cleaned yearly CSV")
+    p.add_argument("--forecast-dir", default="data/forecasts", help="With --warm: forecast directory to fill")
+    p.add_argument("--periods", type=int, default=5, help="With --warm: forecast horizon")
     args = p.parse_args()
     ingest(args.input, args.db)
+    if args.warm:
+        run_warm_up(args.clean, args.forecast_dir, args.periods)
 
 
 if __name__ == "__main__":
@@ -11,13 +11,33 @@ Fixes and improvements applied:
  - Adds a simple health endpoint at /health.
  - Uses a lowercase `app` variable (conventional).
  - Ensures the forecast directory is created when running as __main__.
+ - Passes through the model's lower/upper prediction bounds on forecast rows when the CSV has them.
+ - Reads the columnar store (forecasts.parquet from predict.py --format parquet), loading only
+   the columns the response needs, or the per-state CSV - whichever holds the newer forecast for
+   the series (the store rows' run_id stamp against the CSV's mtime), since warm_cache.py and
+   CSV-mode predict.py runs do not update the store.
+ - ?periods=N answers any horizon from the stored terminal model state (model.forecast_from_params,
+   FORECAST_MODEL_DIR as filled by warm_cache.py --model-dir) without a fit; those forecasts carry
+   no bounds. Without a stored model, or when its record is older than the series' CSV or store
+   run (predict.py and --watch do not refresh it), the file forecast is served, cut to N years.
 """
 from flask import Flask, request, jsonify, send_from_directory, abort
 from flask_cors import CORS
+import calendar
 import os
+import re
+import sys
+import time
 import pandas as pd
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+try:
+    from model import forecast_from_params, get_model_store, series_id_for
+except ImportError:
+    # model.py lives in src/; make it importable when this server runs from src/backend
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")))
+    from model import forecast_from_params, get_model_store, series_id_for
 
 app = Flask(__name__)
 CORS(app)
@@ -25,21 +45,77 @@ logging.basicConfig(level=logging.INFO)
 
 # path where predict.py writes forecasts
 FORECAST_DIR = os.path.abspath(os.path.join(os.getcwd(), "data", "forecasts"))
+# single-file store written by predict.py --format parquet (see forecast_store.py)
+FORECAST_STORE = os.path.join(FORECAST_DIR, "forecasts.parquet")
+STORE_READ_COLUMNS = ["state", "year", "value", "type", "lower", "upper", "method", "run_id"]
 
 
-def cleaned_filename_for_state(state: str) -> str:
+def cleaned_filename_for_state(state: str, metric: str = None) -> str:
     """
-    Create a sanitized forecast filename for a given state label.
+    Create a sanitized forecast filename for a given state label (and optional metric),
+    matching the names predict.py and warm_cache.py write.
     """
+    suffix = f"_{_sanitize(metric)}" if metric else ""
     if not state:
-        return "All_States_Aggregate_forecast.csv"
-    cleaned = str(state).strip()
-    cleaned = cleaned.replace("/", "_").replace(" ", "_")
-    # remove characters other than letters, numbers, underscore and dash
-    cleaned = "".join(ch for ch in cleaned if (ch.isalnum() or ch in ("_", "-")))
+        return f"All_States_Aggregate{suffix}_forecast.csv"
+    cleaned = _sanitize(state)
     if not cleaned:
-        return "All_States_Aggregate_forecast.csv"
-    return f"{cleaned}_forecast.csv"
+        return f"All_States_Aggregate{suffix}_forecast.csv"
+    return f"{cleaned}{suffix}_forecast.csv"
+
+
+def _sanitize(name: str) -> str:
+    # same rules as predict.sanitize_name
+    s = re.sub(r"[()/\\]", " ", str(name).strip())
+    s = re.sub(r"\s+", "_", s)
+    s = re.sub(r"[^\w_]", "", s)
+    return re.sub(r"_+", "_", s)
+
+
+def read_store_rows(state: str, metric: str = None) -> pd.DataFrame:
+    """
+    Rows for one series from the columnar store (empty frame when absent), same matching as
+    forecast_store.read_store: metric is filtered in the Parquet reader, state case-insensitively.
+    """
+    if not os.path.isfile(FORECAST_STORE):
+        return pd.DataFrame()
+    df = pd.read_parquet(FORECAST_STORE, columns=STORE_READ_COLUMNS, filters=[("metric", "==", metric or "")])
+    return df[df["state"].str.strip().str.lower().values == state.strip().lower()].drop(columns="state")
+
+
+def run_stamp(run_id: str) -> float:
+    """Epoch seconds of a forecast_store run id (UTC %Y%m%dT%H%M%SZ); 0 if it cannot be parsed."""
+    try:
+        return float(calendar.timegm(time.strptime(str(run_id), "%Y%m%dT%H%M%SZ")))
+    except ValueError:
+        return 0.0
+
+
+def read_model_rows(state: str, metric: str, periods: int, newer_than: float = 0.0) -> Optional[pd.DataFrame]:
+    """
+    History plus a `periods`-year forecast from the stored model state of one series, or None when
+    no model store is configured, it has no record for the series, or the record was written
+    before `newer_than` (epoch seconds of the newest forecast file for the series).
+    """
+    store = get_model_store()
+    if store is None:
+        return None
+    series_id = series_id_for((state, metric) if metric else (state,))
+    try:
+        forecast = forecast_from_params(series_id, periods=periods, store=store)
+    except KeyError:
+        return None
+    record = store.get(series_id)
+    if record.get("updated_at", 0.0) < newer_than:
+        logging.info("Stored model for %s predates its forecast files; serving the files", series_id)
+        return None
+    n = len(record["years"])
+    return pd.DataFrame({
+        "year": list(record["years"]) + [int(y) for y in forecast.index],
+        "value": list(record["values"]) + [float(v) for v in forecast.values],
+        "type": ["history"] * n + ["forecast"] * periods,
+        "method": [""] * n + [record.get("method", "")] * periods,
+    })
 
 
 @app.route("/health")
@@ -51,28 +127,66 @@ def health():
 def api_forecast():
     """
     Return JSON { state, history: [{year, value, type}], forecast: [...] } for the requested state.
-    Query param: ?state=STATE_NAME
+    Forecast rows also carry lower/upper (and method) when predict.py wrote them.
+    Query params: ?state=STATE_NAME[&metric=METRIC][&periods=N] (metric selects a per-metric file from
+    warm_cache.py; periods asks for an N-year horizon, from the stored model state when there is one)
     If state is "All States (Aggregate)" (case-insensitive) or similar, the aggregate filename is used.
     """
     state = request.args.get("state", "All States (Aggregate)")
-    logging.info("api_forecast requested for state: %s", state)
+    metric = request.args.get("metric")
+    periods = request.args.get("periods")
+    if periods is not None:
+        try:
+            periods = int(periods)
+        except ValueError:
+            return jsonify({"error": "periods must be an integer"}), 400
+        if periods < 1:
+            return jsonify({"error": "periods must be positive"}), 400
+    logging.info("api_forecast requested for state: %s (metric: %s, periods: %s)", state, metric, periods)
 
     # treat All States label as aggregate
-    if state and str(state).strip().lower() in ("all states", "all states (aggregate)", "all_states_aggregate", "all_states"):
-        fname = "All_States_Aggregate_forecast.csv"
+    is_aggregate = bool(state) and str(state).strip().lower() in ("all states", "all states (aggregate)", "all_states_aggregate", "all_states")
+    if is_aggregate:
+        fname = cleaned_filename_for_state("", metric)
     else:
-        fname = cleaned_filename_for_state(state)
-
+        fname = cleaned_filename_for_state(state, metric)
     file_path = os.path.join(FORECAST_DIR, fname)
-    if not os.path.isfile(file_path):
-        logging.warning("Forecast file not found: %s", file_path)
-        return jsonify({"error": "forecast file not found", "requested_file": fname}), 404
+    label = "All States (Aggregate)" if is_aggregate else str(state)
 
     try:
-        df = pd.read_csv(file_path)
+        store_df = read_store_rows(label, metric)
     except Exception as e:
-        logging.exception("Failed to read forecast file %s: %s", file_path, e)
-        return jsonify({"error": "failed to read forecast file", "message": str(e)}), 500
+        logging.exception("Failed to read forecast store %s: %s", FORECAST_STORE, e)
+        store_df = pd.DataFrame()
+    # run ids have whole-second resolution: a file from the same second counts as older than the run
+    store_stamp = run_stamp(store_df["run_id"].max()) + 1 if not store_df.empty else 0.0
+    csv_stamp = os.path.getmtime(file_path) if os.path.isfile(file_path) else 0.0
+
+    df = None
+    if periods is not None:
+        # predict.py and --watch refresh the files but not the model store: a stale record is skipped
+        try:
+            df = read_model_rows(label, metric, periods, newer_than=max(store_stamp, csv_stamp))
+        except Exception as e:
+            logging.exception("Failed to forecast %s from the model store: %s", label, e)
+    if df is not None:
+        file_path = "model store"
+    else:
+        df = store_df
+        if not df.empty and csv_stamp >= store_stamp:
+            df = pd.DataFrame()
+        if not df.empty:
+            df = df.drop(columns="run_id")
+            file_path = FORECAST_STORE
+        elif not os.path.isfile(file_path):
+            logging.warning("Forecast file not found: %s", file_path)
+            return jsonify({"error": "forecast file not found", "requested_file": fname}), 404
+        else:
+            try:
+                df = pd.read_csv(file_path)
+            except Exception as e:
+                logging.exception("Failed to read forecast file %s: %s", file_path, e)
+                return jsonify({"error": "failed to read forecast file", "message": str(e)}), 500
 
     # Normalize columns to lowercase/stripped names
     df.columns = [str(c).strip().lower() for c in df.columns]
@@ -87,6 +201,9 @@ def api_forecast():
     df["value"] = pd.to_numeric(df["value"], errors="coerce")
     if "type" not in df.columns:
         df["type"] = ""
+    bounds = [c for c in ("lower", "upper") if c in df.columns]
+    for c in bounds:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
 
     df = df.dropna(subset=["year", "value"]).copy()
     if df.empty:
@@ -96,6 +213,15 @@ def api_forecast():
     # Sort by year for predictable output
     df = df.sort_values("year")
 
+    if periods is not None and file_path != "model store":
+        # no stored model: serve the horizon on file, cut to the requested years
+        forecast_years = sorted(df.loc[df["type"].astype(str).str.strip().str.lower() == "forecast", "year"])
+        if len(forecast_years) > periods:
+            df = df[~df["year"].isin(forecast_years[periods:])]
+        elif len(forecast_years) < periods:
+            logging.warning("No stored model for %s: serving the %d forecast years on file, not %d",
+                            label, len(forecast_years), periods)
+
     resp: Dict[str, Any] = {"state": state, "history": [], "forecast": []}
     for _, row in df.iterrows():
         try:
@@ -112,6 +238,12 @@ def api_forecast():
         typ = str(row.get("type", "")).strip()
         rec = {"year": year, "value": value, "type": typ}
         if typ.lower() == "forecast":
+            # NaN bounds (interval not estimable) are left out rather than sent as invalid JSON
+            for c in bounds:
+                if pd.notna(row[c]):
+                    rec[c] = float(row[c])
+            if "method" in df.columns and pd.notna(row["method"]):
+                rec["method"] = str(row["method"])
             resp["forecast"].append(rec)
         else:
             resp["history"].append(rec)
@@ -0,0 +1,196 @@
+# path: src/backtest.py
+"""
+Rolling-origin backtesting to pick a forecast method per series.
+
+For every series and every origin (the series cut after its first k observations, k >= --min-train)
+each candidate method forecasts --horizon years ahead and is scored against the held-out actuals.
+
+How work is shared:
+ - linear_trend: all (series, origin) windows are stacked into one matrix and solved in a single
+   model.forecast_trend_matrix pass (no pool needed).
+ - ARIMA methods: origins are split into blocks, and (series, block) tasks run over a process pool.
+   Inside a block each SARIMAX fit is warm-started from the previous origin's parameters, so the
+   optimizer only has to adjust for one extra observation.
+
+Outputs (written to --out when run as a script):
+ - backtest_scores.csv   per series x method: origins, failures, mae, rmse, mape
+ - backtest_winners.csv  per series: the winning method (fewest failures, then lowest --metric)
+
+The winners can be passed straight to model.forecast_many via winners_to_methods().
+
+Usage:
+    python src/backtest.py --clean data/processed/cleaned_groundwater.csv --min-train 5 --horizon 1 --out data/forecasts
+"""
+import argparse
+import logging
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from model import FORECASTERS, fit_sarimax, forecast_trend_matrix, map_tasks, panel_keys, split_panel
+
+DEFAULT_METHODS = ("arima(1,1,1)", "arima(1,1,1)-css", "linear_trend")
+
+
+def origins_for(n_obs: int, min_train: int, max_origins: Optional[int] = None) -> List[int]:
+    """Training lengths to evaluate: min_train .. n_obs-1, optionally only the last max_origins."""
+    origins = list(range(min_train, n_obs))
+    if max_origins:
+        origins = origins[-max_origins:]
+    return origins
+
+
+def _trend_rows(pairs, origins_by_series, horizon: int) -> list:
+    """Backtest rows for linear_trend, solving every (series, origin) window in one matrix pass."""
+    windows = []
+    for i, (_, s) in enumerate(pairs):
+        for o in origins_by_series[i]:
+            windows.append((i, o))
+    if not windows:
+        return []
+    years = np.unique(np.concatenate([np.asarray(s.index, dtype=int) for _, s in pairs]))
+    values = np.full((len(windows), len(years)), np.nan)
+    for row, (i, o) in enumerate(windows):
+        train = pairs[i][1].iloc[:o]
+        values[row, np.searchsorted(years, np.asarray(train.index, dtype=int))] = train.values
+    future_years, forecasts = forecast_trend_matrix(values, years, periods=horizon)
+    rows = []
+    for row, (i, o) in enumerate(windows):
+        key, s = pairs[i]
+        if np.isnan(forecasts[row]).any():
+            rows.append((key, "linear_trend", int(s.index[o - 1]), None, None))
+            continue
+        rows.append((key, "linear_trend", int(s.index[o - 1]), future_years[row].astype(int), forecasts[row]))
+    return rows
+
+
+def _backtest_task(task):
+    """Worker: run one method over a block of origins for one series, warm-starting SARIMAX."""
+    key, series, origins, horizon, method = task
+    rows = []
+    start_params = None
+    for o in origins:
+        train = series.iloc[:o]
+        origin_year = int(train.index[-1])
+        years = origin_year + np.arange(1, horizon + 1)
+        try:
+            if method == "arima(1,1,1)":
+                res = fit_sarimax(train.values, start_params=start_params)
+                start_params = res.params
+                pred = np.asarray(res.forecast(horizon), dtype=float)
+            else:
+                pred = np.asarray(FORECASTERS[method](train, periods=horizon), dtype=float)
+        except Exception:
+            rows.append((key, method, origin_year, None, None))
+            continue
+        rows.append((key, method, origin_year, years, pred))
+    return rows
+
+
+def _score(keys: List[str], pairs, rows: list) -> pd.DataFrame:
+    """Turn raw (key, method, origin, years, forecast) rows into per series x method error scores."""
+    actual_by_key = {key: s for key, s in pairs}
+    acc: Dict[Tuple[tuple, str], dict] = {}
+    for key, method, _origin, years, pred in rows:
+        a = acc.setdefault((key, method), {"origins": 0, "failures": 0, "errors": [], "actuals": []})
+        a["origins"] += 1
+        if pred is None:
+            a["failures"] += 1
+            continue
+        actual = actual_by_key[key].reindex(years).values
+        ok = ~np.isnan(actual)
+        a["errors"].append(pred[ok] - actual[ok])
+        a["actuals"].append(actual[ok])
+    records = []
+    for (key, method), a in acc.items():
+        err = np.concatenate(a["errors"]) if a["errors"] else np.empty(0)
+        act = np.concatenate(a["actuals"]) if a["actuals"] else np.empty(0)
+        nonzero = act != 0
+        rec = dict(zip(keys, key))
+        rec.update({
+            "method": method,
+            "origins": a["origins"],
+            "failures": a["failures"],
+            "mae": float(np.mean(np.abs(err))) if err.size else np.nan,
+            "rmse": float(np.sqrt(np.mean(err ** 2))) if err.size else np.nan,
+            "mape": float(np.mean(np.abs(err[nonzero] / act[nonzero])) * 100) if nonzero.any() else np.nan,
+        })
+        records.append(rec)
+    return pd.DataFrame(records, columns=keys + ["method", "origins", "failures", "mae", "rmse", "mape"])
+
+
+def backtest(df: pd.DataFrame, methods: Sequence[str] = DEFAULT_METHODS, min_train: int = 5, horizon: int = 1,
+             max_origins: Optional[int] = None, processes: Optional[int] = None, block: int = 4,
+             metric: str = "mae") -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Rolling-origin backtest of `methods` over every series of a long (state[, metric], year, value) frame.
+
+    Returns (scores, winners): scores has one row per series x method with origins, failures,
+    mae, rmse and mape; winners has one row per series with the chosen method and its score.
+    """
+    unknown = [m for m in methods if m not in FORECASTERS]
+    if unknown:
+        raise ValueError(f"Unknown methods {unknown}. Choose from {sorted(FORECASTERS)}.")
+    if metric not in ("mae", "rmse", "mape"):
+        raise ValueError("metric must be one of mae|rmse|mape")
+    keys = panel_keys(df)
+    pairs = split_panel(df)
+    origins_by_series = [origins_for(len(s), min_train, max_origins) for _, s in pairs]
+
+    rows = []
+    if "linear_trend" in methods:
+        rows.extend(_trend_rows(pairs, origins_by_series, horizon))
+    tasks = []
+    for (key, s), origins in zip(pairs, origins_by_series):
+        for method in methods:
+            if method == "linear_trend":
+                continue
+            for i in range(0, len(origins), block):
+                tasks.append((key, s, origins[i:i + block], horizon, method))
+    for task_rows in map_tasks(_backtest_task, tasks, processes=processes):
+        rows.extend(task_rows)
+
+    scores = _score(keys, pairs, rows)
+    if scores.empty:
+        return scores, pd.DataFrame(columns=keys + ["method", metric])
+    order = {m: i for i, m in enumerate(methods)}
+    ranked = scores.assign(_order=scores["method"].map(order)).sort_values(keys + ["failures", metric, "_order"], na_position="last")
+    winners = ranked.groupby(keys, sort=True).head(1)[keys + ["method", metric]].reset_index(drop=True)
+    return scores, winners
+
+
+def winners_to_methods(winners: pd.DataFrame) -> Dict[tuple, str]:
+    """Map series keys to their winning method, in the form model.forecast_many(method=...) accepts."""
+    keys = panel_keys(winners)
+    return {tuple(r[k] for k in keys): r["method"] for _, r in winners.iterrows()}
+
+
+def main(args):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    df = pd.read_csv(args.clean)
+    scores, winners = backtest(df, methods=args.methods, min_train=args.min_train, horizon=args.horizon,
+                               max_origins=args.max_origins, processes=args.processes, metric=args.metric)
+    os.makedirs(args.out, exist_ok=True)
+    scores_path = os.path.join(args.out, "backtest_scores.csv")
+    winners_path = os.path.join(args.out, "backtest_winners.csv")
+    scores.to_csv(scores_path, index=False)
+    winners.to_csv(winners_path, index=False)
+    logging.info("Saved backtest scores: %s", scores_path)
+    logging.info("Saved backtest winners: %s", winners_path)
+    print(winners["method"].value_counts().to_string() if not winners.empty else "No series could be backtested.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of forecast methods for every series.")
+    parser.add_argument("--clean", default="data/processed/cleaned_groundwater.csv", help="Cleaned CSV created by process_data.py")
+    parser.add_argument("--methods", nargs="+", default=list(DEFAULT_METHODS), help="Candidate methods (names from model.FORECASTERS).")
+    parser.add_argument("--min-train", type=int, default=5, help="Smallest training window (observations).")
+    parser.add_argument("--horizon", type=int, default=1, help="Years ahead to score at each origin.")
+    parser.add_argument("--max-origins", type=int, default=None, help="Only use the last N origins per series.")
+    parser.add_argument("--metric", default="mae", choices=("mae", "rmse", "mape"), help="Error metric used to pick winners.")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--out", default="data/forecasts", help="Output folder for backtest tables.")
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,289 @@
+# path: src/benchmark_model.py
+"""
+Benchmark the forecasting engines in model.py on a synthetic panel.
+
+Currently measures:
+ - linear trend: per-series forecast_trend_lr loop vs the vectorized forecast_trend_matrix,
+   and checks that both produce the same forecasts
+ - ARIMA(1,1,1): statsmodels SARIMAX vs the NumPy CSS estimator on the first --arima-series
+   series, with the relative forecast deviation counted against model.CSS_TOLERANCE (a threshold,
+   not a parity guarantee: see the CSS notes in model.py)
+
+--suite instead runs the regression suite: synthetic long panels of each --sizes (default
+36, 700 and 7000 series) with 10-40 years per series and configurable --noise, --gaps and
+--trend. For every panel it reports, as JSON:
+ - per-series functions (forecast_arima, forecast_arima_css, forecast_trend_lr, choose_forecast):
+   fits/sec and p50/p99 per-series latency over up to --sample series
+ - batch paths (forecast_trend_matrix, trend_interval_matrix, forecast_many with linear_trend,
+   global_ridge and auto routing): fits/sec over the whole panel
+ - peak Python heap (tracemalloc) for each, from a separate run so tracing doesn't skew the
+   timings. Memory in pool workers is not traced, so batch paths default to --processes 1.
+Every timed function is called once untimed first, so imports, numba compilation and other
+first-call costs stay out of the numbers. Save runs with --out and diff them between releases.
+
+Usage:
+    python src/benchmark_model.py --series 700 --years 20 --periods 5 --repeat 3
+    python src/benchmark_model.py --series 36 --arima-series 36
+    python src/benchmark_model.py --suite --sizes 36 700 7000 --sample 200 --out bench.json
+"""
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from model import (CSS_TOLERANCE, choose_forecast, forecast_arima, forecast_arima_css, forecast_many, forecast_trend_lr,
+                   forecast_trend_matrix, panel_to_matrix, split_panel, trend_interval_matrix)
+
+
+def synthetic_matrix(n_series: int, n_years: int, gap_ratio: float = 0.1, seed: int = 0):
+    """Random linear trends plus noise on a shared year grid, with a fraction of values blanked out."""
+    rng = np.random.default_rng(seed)
+    years = np.arange(2000, 2000 + n_years)
+    level = rng.uniform(10, 1000, size=(n_series, 1))
+    slope = rng.normal(0, 5, size=(n_series, 1))
+    values = level + slope * (years - years[0]) + rng.normal(0, 10, size=(n_series, n_years))
+    gaps = rng.random(values.shape) < gap_ratio
+    gaps[:, -1] = False  # keep the last year so both paths extrapolate from the same origin
+    values[gaps] = np.nan
+    return years, values
+
+
+def synthetic_panel(n_series: int, min_years: int = 10, max_years: int = 40, noise: float = 0.05,
+                    gap_ratio: float = 0.1, trend: float = 0.02, seed: int = 0) -> pd.DataFrame:
+    """
+    Long (state, year, value) frame of random-walk-plus-trend series with uneven lengths.
+
+    noise and trend are relative to each series' level (std of yearly shocks, std of the yearly
+    slope); gap_ratio blanks out that fraction of observations (the last year is always kept).
+    """
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(min_years, max_years + 1, size=n_series)
+    frames = []
+    for i, n in enumerate(lengths):
+        years = np.arange(2024 - n + 1, 2025)
+        level = rng.uniform(10, 1000)
+        slope = rng.normal(0, trend) * level
+        values = level + slope * np.arange(n) + np.cumsum(rng.normal(0, noise * level, size=n))
+        keep = rng.random(n) >= gap_ratio
+        keep[-1] = True
+        frames.append(pd.DataFrame({"state": f"S{i:05d}", "year": years[keep], "value": values[keep]}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def per_series_profile(fn, series: list, memory: bool = True) -> dict:
+    """Time fn on every series separately, then (optionally) rerun under tracemalloc for the peak heap."""
+    latencies = np.empty(len(series))
+    failures = 0
+    warm_up(lambda: fn(series[0]) if series else None)
+    t_start = time.perf_counter()
+    for i, s in enumerate(series):
+        t0 = time.perf_counter()
+        try:
+            fn(s)
+        except Exception:
+            failures += 1
+        latencies[i] = time.perf_counter() - t0
+    total = time.perf_counter() - t_start
+    out = {
+        "series": len(series),
+        "failures": failures,
+        "seconds": total,
+        "fits_per_sec": len(series) / total if total > 0 else None,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000) if len(series) else None,
+        "p99_ms": float(np.percentile(latencies, 99) * 1000) if len(series) else None,
+    }
+    if memory:
+        def run_all():
+            for s in series:
+                try:
+                    fn(s)
+                except Exception:
+                    pass
+        out["peak_mb"] = peak_memory_mb(run_all)
+    return out
+
+
+def batch_profile(fn, n_series: int, repeat: int, memory: bool = True, warmup: bool = True) -> dict:
+    """Best-of-repeat wall time for one call covering the whole panel."""
+    seconds = best_of(fn, repeat, warmup=warmup)
+    out = {
+        "series": n_series,
+        "seconds": seconds,
+        "fits_per_sec": n_series / seconds if seconds > 0 else None,
+        "mean_ms_per_series": seconds / n_series * 1000 if n_series else None,
+    }
+    if memory:
+        out["peak_mb"] = peak_memory_mb(fn)
+    return out
+
+
+def peak_memory_mb(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def run_suite(args) -> dict:
+    memory = not args.no_memory
+    result = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "periods": args.periods,
+        "sample": args.sample,
+        "processes": args.processes,
+        "panels": [],
+    }
+    for n_series in args.sizes:
+        df = synthetic_panel(n_series, args.min_years, args.max_years, noise=args.noise,
+                             gap_ratio=args.gaps, trend=args.trend, seed=args.seed)
+        pairs = split_panel(df)
+        sample = [s for _, s in pairs[: args.sample]]
+        years, values = panel_to_matrix(pairs)
+        periods = args.periods
+        panel = {"series": n_series, "observations": int(len(df)), "per_series": {}, "batch": {}}
+        per_series = {
+            "forecast_arima": lambda s: forecast_arima(s, periods=periods),
+            "forecast_arima_css": lambda s: forecast_arima_css(s, periods=periods),
+            "forecast_trend_lr": lambda s: forecast_trend_lr(s, periods=periods),
+            "choose_forecast": lambda s: choose_forecast(s, periods=periods),
+        }
+        for name, fn in per_series.items():
+            panel["per_series"][name] = per_series_profile(fn, sample, memory=memory)
+        batch = {
+            "forecast_trend_matrix": lambda: forecast_trend_matrix(values, years, periods=periods),
+            "trend_interval_matrix": lambda: trend_interval_matrix(values, years, periods=periods),
+            "forecast_many[linear_trend]": lambda: forecast_many(df, periods=periods, method="linear_trend"),
+            "forecast_many[global_ridge]": lambda: forecast_many(df, periods=periods, method="global_ridge"),
+        }
+        for name, fn in batch.items():
+            panel["batch"][name] = batch_profile(fn, n_series, args.repeat, memory=memory)
+        if n_series <= args.auto_max_series:
+            # one run only: this fits SARIMAX for every ARIMA-routed series. No separate warm-up -
+            # the per-series runs above already imported statsmodels and compiled the kernels.
+            panel["batch"]["forecast_many[auto]"] = batch_profile(
+                lambda: forecast_many(df, periods=periods, processes=args.processes), n_series, 1, memory=memory,
+                warmup=False)
+        result["panels"].append(panel)
+    return result
+
+
+def warm_up(fn):
+    """Run fn once untimed, so imports, numba compilation and first-call caches don't land in a timing."""
+    try:
+        fn()
+    except Exception:
+        pass
+
+
+def best_of(fn, repeat: int, warmup: bool = True) -> float:
+    if warmup:
+        warm_up(fn)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def bench_trend(years, values, periods: int, repeat: int) -> dict:
+    series = [pd.Series(row, index=years) for row in values]
+
+    def loop():
+        return [forecast_trend_lr(s, periods=periods) for s in series]
+
+    def vectorized():
+        return forecast_trend_matrix(values, years, periods=periods)
+
+    loop_s = best_of(loop, repeat)
+    vec_s = best_of(vectorized, repeat)
+    expected = np.vstack([f.values for f in loop()])
+    _, got = vectorized()
+    return {
+        "series": int(values.shape[0]),
+        "years": int(values.shape[1]),
+        "loop_seconds": loop_s,
+        "vectorized_seconds": vec_s,
+        "speedup": loop_s / vec_s if vec_s > 0 else None,
+        "max_abs_diff": float(np.max(np.abs(expected - got))),
+        "allclose": bool(np.allclose(expected, got, rtol=1e-9, atol=1e-9)),
+    }
+
+
+def bench_arima(years, values, periods: int) -> dict:
+    series = [pd.Series(row, index=years) for row in values]
+    t0 = time.perf_counter()
+    import statsmodels.tsa.statespace.sarimax  # noqa: F401  (import cost is part of what CSS avoids)
+    import_s = time.perf_counter() - t0
+    warm_up(lambda: forecast_arima(series[0], periods=periods))
+    warm_up(lambda: forecast_arima_css(series[0], periods=periods))
+
+    t0 = time.perf_counter()
+    sarimax = [forecast_arima(s, periods=periods).values for s in series]
+    sarimax_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    css = [forecast_arima_css(s, periods=periods).values for s in series]
+    css_s = time.perf_counter() - t0
+
+    scale = np.array([np.nanmean(np.abs(row)) for row in values])
+    deviation = np.array([np.max(np.abs(a - b)) for a, b in zip(sarimax, css)]) / np.where(scale > 0, scale, 1.0)
+    return {
+        "series": len(series),
+        "statsmodels_import_seconds": import_s,
+        "sarimax_fit_seconds": sarimax_s,
+        "css_fit_seconds": css_s,
+        "speedup": sarimax_s / css_s if css_s > 0 else None,
+        "relative_deviation_median": float(np.median(deviation)),
+        "relative_deviation_max": float(np.max(deviation)),
+        "tolerance": CSS_TOLERANCE,
+        "within_tolerance": int(np.sum(deviation <= CSS_TOLERANCE)),
+    }
+
+
+def main(args):
+    if args.suite:
+        result = run_suite(args)
+        text = json.dumps(result, indent=2)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as fh:
+                fh.write(text)
+        print(text)
+        return
+    years, values = synthetic_matrix(args.series, args.years, gap_ratio=args.gaps, seed=args.seed)
+    result = {"linear_trend": bench_trend(years, values, args.periods, args.repeat)}
+    if args.arima_series > 0:
+        result["arima"] = bench_arima(years, values[: args.arima_series], args.periods)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark model.py forecasting engines on a synthetic panel.")
+    parser.add_argument("--series", type=int, default=700, help="Number of synthetic series.")
+    parser.add_argument("--years", type=int, default=20, help="Years per series.")
+    parser.add_argument("--periods", type=int, default=5, help="Forecast horizon.")
+    parser.add_argument("--gaps", type=float, default=0.1, help="Fraction of observations blanked out as NaN.")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per measurement (best time is reported).")
+    parser.add_argument("--arima-series", type=int, default=0, help="Also compare SARIMAX vs CSS ARIMA on this many series (0 = skip).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic panel.")
+    parser.add_argument("--suite", action="store_true", help="Run the regression suite over --sizes panels instead.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[36, 700, 7000], help="Suite: number of series per panel.")
+    parser.add_argument("--min-years", type=int, default=10, help="Suite: shortest series length.")
+    parser.add_argument("--max-years", type=int, default=40, help="Suite: longest series length.")
+    parser.add_argument("--noise", type=float, default=0.05, help="Suite: yearly shock std, relative to the series level.")
+    parser.add_argument("--trend", type=float, default=0.02, help="Suite: std of the yearly slope, relative to the series level.")
+    parser.add_argument("--sample", type=int, default=200, help="Suite: series timed per single-series function.")
+    parser.add_argument("--auto-max-series", type=int, default=700, help="Suite: largest panel to run forecast_many auto on.")
+    parser.add_argument("--processes", type=int, default=1, help="Suite: worker processes for forecast_many auto.")
+    parser.add_argument("--no-memory", action="store_true", help="Suite: skip the tracemalloc peak-memory runs.")
+    parser.add_argument("--out", default=None, help="Suite: also write the JSON report to this file.")
+    args = parser.parse_args()
+    main(args)
@@ -20,6 +20,8 @@ What it does:
     - data/forecasts/<metric>_per_state_forecasts.csv  (history + forecast rows for all states)
     - data/forecasts/<metric>_aggregate_forecast.csv   (aggregate sum/mean history + forecasts)
     - PNG plot per-state in data/forecasts/plots/<State>_<metric>_forecast.png
+      (rendered after the CSV/JSON outputs, over a process pool via render_plots.py;
+       --processes sets the workers, --no-plots skips them)
 - Prints available metrics if you don't specify one.
 
 Usage examples:
@@ -31,6 +33,10 @@ Usage examples:
   python src/forecast_from_snapshot.py --input ea156058-114e-48d4-b70a-7f266536d94f.csv \
       --metric "Stage of GW extraction (%)" --base-year 2024 --periods 5 --delta 0.5 --mode linear
 
+  # Derive stage of extraction from availability and extraction projections instead of projecting it
+  python src/forecast_from_snapshot.py --input ea156058-114e-48d4-b70a-7f266536d94f.csv \
+      --stage-from "Net Ground Water Availability" "Total Annual Extraction" --rate 0.01 --extraction-rate 0.03
+
 Notes:
 - Choose mode=compound with --rate (e.g., -0.01 for -1% per year) OR mode=linear with --delta (absolute change per year).
 - This is a scenario-based projection rather than a statistical forecast. If you can provide historical yearly files,
@@ -41,10 +47,12 @@ import os
 import re
 from typing import List
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
+from model import derive_stage
+from render_plots import render_all
+
 
 def sanitize_filename(s: str) -> str:
     s = str(s).strip()
@@ -84,6 +92,20 @@ def build_forecasts_for_value(value: float, periods: int, mode: str, rate: float
     return years, hist
 
 
+def resolve_metric(df: pd.DataFrame, name: str) -> str:
+    if name in df.columns:
+        return name
+    # try case-insensitive match
+    matches = [c for c in df.columns if c.lower() == name.lower()]
+    if matches:
+        return matches[0]
+    close = [c for c in df.columns if name.lower() in c.lower()]
+    print(f"Metric '{name}' not found. Closest matches:")
+    for c in close:
+        print(" -", c)
+    raise SystemExit(1)
+
+
 def ensure_dirs(base: str):
     os.makedirs(base, exist_ok=True)
     os.makedirs(os.path.join(base, "plots"), exist_ok=True)
@@ -93,24 +115,18 @@ def run(args):
     df = read_snapshot(args.input)
     # Normalize column names to original labels (we will show choices)
     available = list_metrics(df)
-    if not args.metric:
+    if not args.metric and not args.stage_from:
         print("Available metric columns (choose one with --metric):")
         for c in available:
             print(" -", c)
         raise SystemExit(0)
 
-    metric = args.metric
-    if metric not in df.columns:
-        # try case-insensitive match
-        matches = [c for c in df.columns if c.lower() == metric.lower()]
-        if matches:
-            metric = matches[0]
-        else:
-            close = [c for c in df.columns if metric.lower() in c.lower()]
-            print(f"Metric '{args.metric}' not found. Closest matches:")
-            for c in close:
-                print(" -", c)
-            raise SystemExit(1)
+    if args.stage_from:
+        # stage = extraction / availability x 100, projected through its two inputs
+        avail_col, extr_col = (resolve_metric(df, c) for c in args.stage_from)
+        metric = "stage"
+    else:
+        metric = resolve_metric(df, args.metric)
 
     # Determine state name column (try several common names)
     state_col_candidates = [c for c in df.columns if re.search(r"state|region|name", c, re.I)]
@@ -119,9 +135,9 @@ def run(args):
     state_col = state_col_candidates[0]
 
     # Ensure numeric metric values
-    values = pd.to_numeric(df[metric], errors="coerce")
-    if values.isna().all():
-        raise SystemExit(f"Metric '{metric}' contains no numeric values.")
+    for col in ([avail_col, extr_col] if args.stage_from else [metric]):
+        if pd.to_numeric(df[col], errors="coerce").isna().all():
+            raise SystemExit(f"Metric '{col}' contains no numeric values.")
 
     base_year = int(args.base_year)
     periods = int(args.periods)
@@ -134,36 +150,47 @@ def run(args):
     plots_dir = os.path.join(out_dir, "plots")
 
     rows = []
+    totals_rows = []
+    plot_jobs = []
     # For each state create history and forecasts (we treat the single known year as history)
     for idx, row in df.iterrows():
         state = str(row[state_col]).strip()
         try:
-            val = float(row[metric])
+            if args.stage_from:
+                avail_val, extr_val = float(row[avail_col]), float(row[extr_col])
+            else:
+                val = float(row[metric])
         except Exception:
             # skip non-numeric
             continue
         # Build forecast values for periods years ahead
-        years_offset, series_vals = build_forecasts_for_value(val, periods, mode, rate, delta)
+        if args.stage_from:
+            extr_rate = args.extraction_rate if args.extraction_rate is not None else rate
+            extr_delta = args.extraction_delta if args.extraction_delta is not None else delta
+            years_offset, avail_vals = build_forecasts_for_value(avail_val, periods, mode, rate, delta)
+            _, extr_vals = build_forecasts_for_value(extr_val, periods, mode, extr_rate, extr_delta)
+            series_vals = list(derive_stage(avail_vals, extr_vals))
+        else:
+            years_offset, series_vals = build_forecasts_for_value(val, periods, mode, rate, delta)
         # Convert offsets to actual years
         years = [int(base_year + y) for y in years_offset]
         # First element is history (base year)
         for i, y in enumerate(years):
             ttype = "history" if i == 0 else "forecast"
             rows.append({"state": state, "year": int(y), "value": float(series_vals[i]), "type": ttype})
-
-        # Save per-state plot
-        hist_years = years
-        hist_vals = series_vals
-        plt.figure(figsize=(7, 4))
-        plt.plot(hist_years, hist_vals, marker="o", linestyle=("-" if len(hist_years) > 1 else "-"))
-        plt.title(f"{state} — {metric} projection")
-        plt.xlabel("Year")
-        plt.ylabel(metric)
-        plt.grid(True)
-        plt.tight_layout()
-        fname = os.path.join(plots_dir, f"{sanitize_filename(state)}_{sanitize_filename(metric)}_forecast.png")
-        plt.savefig(fname)
-        plt.close()
+            if args.stage_from:
+                totals_rows.append({"year": int(y), "availability": avail_vals[i], "extraction": extr_vals[i]})
+
+        # Queue per-state plot; rendered once all numbers are saved
+        if not args.no_plots:
+            plot_jobs.append({
+                "path": os.path.join(plots_dir, f"{sanitize_filename(state)}_{sanitize_filename(metric)}_forecast.png"),
+                "title": f"{state} — {metric} projection",
+                "xlabel": "Year",
+                "ylabel": metric,
+                "lines": [{"x": years, "y": [float(v) for v in series_vals]}],
+                "figsize": (7, 4),
+            })
 
     # Create combined DataFrame
     out_df = pd.DataFrame(rows)
@@ -174,7 +201,12 @@ def run(args):
     print("Saved per-state forecasts to:", metric_path)
 
     # Also produce an aggregate series (sum across states per year)
-    agg = out_df.groupby("year")["value"].sum().reset_index().sort_values("year")
+    if args.stage_from:
+        # a sum of percentages is meaningless: the aggregate stage is total extraction / total availability
+        totals = pd.DataFrame(totals_rows).groupby("year")[["availability", "extraction"]].sum().reset_index()
+        agg = pd.DataFrame({"year": totals["year"], "value": derive_stage(totals["availability"], totals["extraction"])})
+    else:
+        agg = out_df.groupby("year")["value"].sum().reset_index().sort_values("year")
     agg_fname = f"{sanitize_filename(metric)}_aggregate_forecast.csv"
     agg_path = os.path.join(out_dir, agg_fname)
     agg.to_csv(agg_path, index=False)
@@ -199,7 +231,9 @@ def run(args):
     except Exception:
         pass
 
-    print("Plots for each state saved in:", plots_dir)
+    if plot_jobs:
+        failed = sum(1 for _, error in render_all(plot_jobs, processes=args.processes) if error)
+        print(f"Plots for each state saved in: {plots_dir} ({len(plot_jobs) - failed} rendered, {failed} failed)")
     print("Done.")
 
 
@@ -212,7 +246,14 @@ def build_argparser():
     p.add_argument("--mode", choices=("compound", "linear"), default="compound", help="Compound percent growth or linear absolute delta per year")
     p.add_argument("--rate", type=float, default=0.0, help="Annual compound growth rate (e.g., 0.01 for +1%%, -0.01 for -1%%). Used when mode=compound.")
     p.add_argument("--delta", type=float, default=0.0, help="Annual absolute change (same units as metric). Used when mode=linear.")
+    p.add_argument("--stage-from", nargs=2, metavar=("AVAILABILITY", "EXTRACTION"), default=None,
+                   help="Derive stage of extraction (%%) from these two columns instead of projecting --metric. "
+                        "--rate/--delta then apply to availability.")
+    p.add_argument("--extraction-rate", type=float, default=None, help="With --stage-from: compound rate for extraction (default: --rate).")
+    p.add_argument("--extraction-delta", type=float, default=None, help="With --stage-from: linear delta for extraction (default: --delta).")
     p.add_argument("--out", default="data/forecasts", help="Output directory for forecasts and plots.")
+    p.add_argument("--processes", type=int, default=None, help="Worker processes for plot rendering (default: CPU count).")
+    p.add_argument("--no-plots", action="store_true", help="Only write the forecast CSV/JSON files; skip per-state PNGs.")
     return p
 
 
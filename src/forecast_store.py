@@ -0,0 +1,100 @@
+# path: src/forecast_store.py
+"""
+Single-file columnar forecast store (Parquet) as an alternative to one CSV per state.
+
+All forecasts of a run are written with one file open as rows of
+    state, metric, year, value, type, method, lower, upper, run_id
+(history rows have empty method and NaN bounds). A later run replaces only the series it
+recomputed: rows of other (state, metric) pairs are carried over, and the file is swapped
+in atomically, so readers never see a partial store. Readers should ask for the columns they
+need and filter by metric - Parquet then skips everything else.
+
+Usage:
+    python src/predict.py --clean data/processed/cleaned_groundwater.csv --all-states --format parquet
+    python src/forecast_store.py --store data/forecasts/forecasts.parquet --state Maharashtra
+"""
+import argparse
+import os
+import time
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from atomic_io import atomic_path
+
+STORE_NAME = "forecasts.parquet"
+STORE_COLUMNS = ("state", "metric", "year", "value", "type", "method", "lower", "upper", "run_id")
+
+
+def new_run_id() -> str:
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+
+
+def tag_frame(frame: pd.DataFrame, state: str, metric: str = "") -> pd.DataFrame:
+    """Add the series identity to a (year, value, type[, lower, upper, method]) frame."""
+    return frame.assign(state=state, metric=metric or "")
+
+
+def _normalize(frame: pd.DataFrame) -> pd.DataFrame:
+    frame = frame.reindex(columns=list(STORE_COLUMNS))
+    frame["year"] = frame["year"].astype(int)
+    for c in ("value", "lower", "upper"):
+        frame[c] = frame[c].astype(float)
+    for c in ("state", "metric", "type", "method", "run_id"):
+        frame[c] = frame[c].fillna("").astype(str)
+    return frame
+
+
+def write_store(frames: Iterable[pd.DataFrame], path: str, run_id: Optional[str] = None) -> int:
+    """
+    Write tagged forecast frames into the store at `path` in one pass; returns the rows written.
+    Series already in the store but not in `frames` are kept.
+    """
+    frames = list(frames)
+    if not frames:
+        return 0
+    new = _normalize(pd.concat(frames, ignore_index=True).assign(run_id=run_id or new_run_id()))
+    if os.path.isfile(path):
+        old = pd.read_parquet(path)
+        replaced = pd.MultiIndex.from_frame(new[["state", "metric"]].drop_duplicates())
+        keep = ~pd.MultiIndex.from_frame(old[["state", "metric"]]).isin(replaced)
+        new = pd.concat([_normalize(old[keep]), new], ignore_index=True)
+    new = new.sort_values(["state", "metric", "year"], kind="stable")
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_path(path) as tmp:
+        new.to_parquet(tmp, index=False)
+    return len(new)
+
+
+def read_store(path: str, state: Optional[str] = None, metric: Optional[str] = None,
+               columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Rows of the store, optionally for one state (case-insensitive) and metric.
+    Only `columns` (plus the filter columns) are read from disk.
+    """
+    wanted = list(columns) if columns else list(STORE_COLUMNS)
+    read_cols = list(dict.fromkeys(wanted + (["state"] if state else [])))
+    filters = [("metric", "==", metric)] if metric is not None else None
+    df = pd.read_parquet(path, columns=read_cols, filters=filters)
+    if state:
+        df = df[df["state"].str.strip().str.lower().values == state.strip().lower()]
+    return df[wanted].reset_index(drop=True)
+
+
+def main(args):
+    df = read_store(args.store, state=args.state, metric=args.metric)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(df if not df.empty else "No rows found.")
+    if not df.empty:
+        print("runs:", np.unique(df["run_id"]).tolist())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the columnar forecast store.")
+    parser.add_argument("--store", default=os.path.join("data", "forecasts", STORE_NAME), help="Store file to read.")
+    parser.add_argument("--state", default=None, help="Only rows for this state.")
+    parser.add_argument("--metric", default=None, help="Only rows for this metric ('' for single-metric runs).")
+    args = parser.parse_args()
+    main(args)
@@ -1,17 +1,20 @@
 // path: src/frontend/fetchForecast.js
 //
 // Small helper to fetch forecast data used by the dashboard UI.
-// - Tries /api/forecast?state=... (JSON)
-// - If that fails, falls back to /static/forecasts/<State>_forecast.csv (CSV)
-// - Returns { state, history: [{year, value}], forecast: [{year, value}] } or throws an Error.
+// - Tries /api/forecast?state=...[&metric=...] (JSON)
+// - If that fails, falls back to /static/forecasts/<State>[_<metric>]_forecast.csv (CSV)
+// - Returns { state, history: [{year, value}], forecast: [{year, value, lower?, upper?}] } or throws an Error.
+//   lower/upper are the model's prediction-interval bounds when the forecast files include them.
 //
 // Usage:
 //   import { getForecast } from './fetchForecast';
 //   const data = await getForecast('All States (Aggregate)');
+//   const availability = await getForecast('Maharashtra', 'availability');  // one metric of a multi-metric panel
 //
 
-export async function getForecast(state = "All States (Aggregate)") {
-    const apiUrl = `/api/forecast?state=${encodeURIComponent(state)}`;
+export async function getForecast(state = "All States (Aggregate)", metric = null) {
+    const metricParam = metric ? `&metric=${encodeURIComponent(metric)}` : "";
+    const apiUrl = `/api/forecast?state=${encodeURIComponent(state)}${metricParam}`;
     try {
       const res = await fetch(apiUrl, { credentials: "same-origin" });
       if (res.ok) {
@@ -31,7 +34,8 @@ export async function getForecast(state = "All States (Aggregate)") {
   
     // CSV fallback: build filename and try to fetch static CSV
     const cleaned = (state || "All States (Aggregate)").replace(/ /g, "_").replace(/\//g, "_");
-    const csvPath = `/static/forecasts/${cleaned}_forecast.csv`;
+    const suffix = metric ? `_${metric.replace(/ /g, "_")}` : "";
+    const csvPath = `/static/forecasts/${cleaned}${suffix}_forecast.csv`;
     try {
       const resp = await fetch(csvPath, { credentials: "same-origin" });
       if (!resp.ok) {
@@ -46,7 +50,7 @@ export async function getForecast(state = "All States (Aggregate)") {
   }
   
   function parseForecastCsv(csvText, state) {
-    // very small CSV parser that expects header: year,value,type
+    // very small CSV parser that expects header: year,value,type (optionally lower,upper)
     const lines = csvText.trim().split(/\r?\n/).filter(Boolean);
     if (lines.length < 2) {
       return { state, history: [], forecast: [] };
@@ -55,6 +59,8 @@ export async function getForecast(state = "All States (Aggregate)") {
     const idxYear = header.indexOf("year");
     const idxValue = header.indexOf("value");
     const idxType = header.indexOf("type");
+    const idxLower = header.indexOf("lower");
+    const idxUpper = header.indexOf("upper");
     const history = [];
     const forecast = [];
     for (let i = 1; i < lines.length; i++) {
@@ -63,8 +69,15 @@ export async function getForecast(state = "All States (Aggregate)") {
       const val = parseFloat(cols[idxValue]);
       const typ = idxType >= 0 ? (cols[idxType] || "").trim().toLowerCase() : "";
       const rec = { year, value: isNaN(val) ? null : val };
-      if (typ === "forecast") forecast.push(rec);
-      else history.push(rec);
+      if (typ === "forecast") {
+        const lo = idxLower >= 0 ? parseFloat(cols[idxLower]) : NaN;
+        const up = idxUpper >= 0 ? parseFloat(cols[idxUpper]) : NaN;
+        if (!isNaN(lo) && !isNaN(up)) {
+          rec.lower = lo;
+          rec.upper = up;
+        }
+        forecast.push(rec);
+      } else history.push(rec);
     }
     return { state, history, forecast };
   }
\ No newline at end of file
@@ -14,6 +14,14 @@ export interface PredictionData {
   confidenceHigh: number;
 }
 
+/** Forecast row served by the backend (see src/frontend/fetchForecast.js) */
+export interface ForecastPoint {
+  year: number;
+  value: number | null;
+  lower?: number;
+  upper?: number;
+}
+
 export interface StatePrediction {
   state: string;
   currentYear: number;
@@ -72,7 +80,8 @@ export function generatePredictions(
     const utilization = data.totalAnnualExtraction * Math.pow(1 + utilizationGrowthRate, i);
     const extraction = data.stageOfExtraction * Math.pow(1 + extractionGrowthRate, i);
     
-    // Calculate confidence intervals (±10% for year 1, increasing to ±25% for year 5)
+    // Fallback confidence band (±10% for year 1, increasing to ±25% for year 5);
+    // applyForecastBounds swaps in the relative width of the served availability interval when available
     const confidenceMargin = 0.1 + (i - 1) * 0.0375; // 10% to 25%
     
     predictions.push({
@@ -99,6 +108,52 @@ export function generatePredictions(
   };
 }
 
+/** Metric of the served availability forecast in multi-metric panels (warm_cache.py on a metric column) */
+export const AVAILABILITY_METRIC = 'availability';
+
+/**
+ * Replace the heuristic confidence band with the width of the prediction interval computed
+ * by the forecasting backend, for every year the served forecast has bounds for.
+ *
+ * `forecast` must be the served availability series: the state's single pipeline series
+ * (process_data.py fills `value` from availability when the raw table has it) or, in a
+ * multi-metric panel, the AVAILABILITY_METRIC one. Bounds of any other metric describe a
+ * different quantity and must not be passed here.
+ * The plotted line is this module's compound-growth curve, not the model mean, and the served
+ * series may be in other units, so the interval is applied relative to the model mean
+ * (lower / value, upper / value) around the plotted availability. The band therefore always
+ * brackets the line it is drawn around.
+ */
+export function applyForecastBounds(
+  prediction: StatePrediction,
+  forecast: ForecastPoint[]
+): StatePrediction {
+  const ratios = new Map<number, { low: number; high: number }>();
+  forecast.forEach(p => {
+    if (p.lower !== undefined && p.upper !== undefined && p.value !== null && p.value > 0) {
+      ratios.set(p.year, {
+        low: Math.min(1, p.lower / p.value),
+        high: Math.max(1, p.upper / p.value),
+      });
+    }
+  });
+  if (ratios.size === 0) return prediction;
+
+  return {
+    ...prediction,
+    predictions: prediction.predictions.map(p => {
+      const r = ratios.get(p.year);
+      return r
+        ? {
+            ...p,
+            confidenceLow: Math.max(0, p.availability * r.low),
+            confidenceHigh: p.availability * r.high,
+          }
+        : p;
+    }),
+  };
+}
+
 /**
  * Determine trend based on extraction changes
  */
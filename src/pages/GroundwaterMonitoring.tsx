@@ -19,8 +19,11 @@ import {
   generatePredictions, 
   generateAggregatePredictions,
   getPredictionSummary,
+  applyForecastBounds,
+  AVAILABILITY_METRIC,
   type StatePrediction 
 } from "@/lib/groundwaterPrediction";
+import { getForecast } from "@/frontend/fetchForecast";
 import { toast } from "sonner";
 
 const GroundwaterMonitoring = () => {
@@ -64,6 +67,21 @@ const GroundwaterMonitoring = () => {
       if (stateData) {
         const prediction = generatePredictions(stateData);
         setStatePrediction(prediction);
+        let cancelled = false;
+        // swap in the model's prediction interval once the served availability forecast
+        // arrives: the pipeline's single series (process_data.py prefers availability for it),
+        // else the availability file of a multi-metric panel; without either the band stays
+        getForecast(selectedState)
+          .catch(() => getForecast(selectedState, AVAILABILITY_METRIC))
+          .then(served => {
+            if (!cancelled) setStatePrediction(applyForecastBounds(prediction, served.forecast ?? []));
+          })
+          .catch(() => {
+            // no served forecast for this state: keep the fallback band
+          });
+        return () => {
+          cancelled = true;
+        };
       }
     } else {
       setStatePrediction(null);
@@ -9,21 +9,56 @@ This corrected version:
  - clearer handling of "All States (Aggregate)" label and --aggregate/--all flags
  - raises helpful errors when a series is empty or too short to forecast
  - returns non-zero exit when nothing was produced (useful for CI / frontend checks)
+ - forecast rows carry lower/upper prediction bounds (--interval sets the coverage, default 95%)
+ - the cleaned frame is indexed once into a SeriesStore (per-state array slices + precomputed
+   aggregate), so each state lookup is a dict hit instead of a copy-and-mask of the whole frame
+ - --all-states / --states-file forecast many states in one run: the CSV is read once and states
+   are spread over a worker pool (--processes); a run summary is written to <out>/run_summary.json
+ - --format parquet writes every series of the run into one columnar store (forecast_store.py,
+   <out>/forecasts.parquet, tagged with a run id) instead of one CSV per state
+ - incremental reruns: <out>/forecast_manifest.json records each series' input hash, run parameters
+   and outputs; series whose data and parameters are unchanged (and whose outputs still exist) are
+   skipped, plots included. --force recomputes everything
+ - --watch keeps running: the cleaned CSV is polled (mtime/size) and, when it changes, reloaded and
+   every state plus the aggregate is refreshed through the manifest, so only series whose data
+   changed are recomputed. Outputs are written to temp files and renamed into place
+ - --jobs jobs.json|yaml runs many (state, metric, periods, method) jobs in one process: jobs that
+   share a series, method and interval share one fit (at the longest horizon asked for, then cut
+   per job), fits run over a worker pool, and <out>/jobs_report.json lists status and timing per job.
+   With --format parquet the jobs go into the run's store as (state, metric) series, one per pair
+ - --reconcile METHOD (with --all-states / --watch) publishes a total that is coherent with the
+   state forecasts of the run (reconcile.py); bottom_up needs no aggregate fit at all
+ - plots are a separate stage (render_plots.py, Agg backend): in --all-states runs every CSV is
+   written before any PNG is rendered, and rendering runs over its own pool; --no-plots skips it
 
 Usage:
     python src/predict.py --clean data/processed/cleaned_groundwater.csv --state "Maharashtra" --periods 5 --out data/forecasts
     python src/predict.py --clean data/processed/cleaned_groundwater.csv --aggregate --periods 5 --out data/forecasts
+    python src/predict.py --clean data/processed/cleaned_groundwater.csv --all-states --processes 8 --out data/forecasts
+    python src/predict.py --clean data/processed/cleaned_groundwater.csv --states-file states.txt --out data/forecasts
+    python src/predict.py --clean data/processed/cleaned_groundwater.csv --all-states --reconcile ols --out data/forecasts
+    python src/predict.py --clean data/processed/cleaned_groundwater.csv --watch --poll 30 --out data/forecasts
+    python src/predict.py --clean data/processed/cleaned_groundwater.csv --jobs jobs.json --processes 8 --out data/forecasts
 """
 import argparse
+import hashlib
+import json
 import logging
 import os
 import re
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 
-from model import choose_forecast
+from atomic_io import atomic_path, write_json
+from forecast_store import STORE_NAME, new_run_id, read_store, tag_frame, write_store
+from model import FORECASTERS, choose_forecast_interval, forecast_interval, map_tasks
+from reconcile import reconcile_frame
+from render_plots import render, render_all
 
 
 def ensure_dir(p):
@@ -31,6 +66,11 @@ def ensure_dir(p):
     return p
 
 
+def write_csv_atomic(frame: pd.DataFrame, path: str):
+    with atomic_path(path) as tmp:
+        frame.to_csv(tmp, index=False)
+
+
 def sanitize_name(name: str) -> str:
     """Make a filesystem-safe name from an arbitrary state label."""
     if not name:
@@ -55,84 +95,706 @@ def is_all_states_label(label: str) -> bool:
     return low in ("all states", "all states (aggregate)", "all_states_aggregate", "all_states")
 
 
-def prepare_series(df: pd.DataFrame, state: str = None, aggregate: bool = False) -> pd.Series:
+class SeriesStore:
+    """
+    Yearly series of a cleaned (state, year, value) frame, indexed once for repeated lookups.
+
+    The frame is grouped a single time into one year array and one value array sorted by
+    (normalized state, year); each state owns a contiguous slice of them, found through a dict
+    keyed by the stripped, lower-cased name. The all-states total is computed up front as well,
+    so get() builds a small Series over array views instead of copying and masking the frame.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        if not set(["state", "year", "value"]).issubset(df.columns):
+            raise ValueError("Cleaned CSV must contain 'state', 'year', and 'value' columns.")
+        state = df["state"].astype(str).str.strip()
+        norm = state.str.lower()
+        values = pd.to_numeric(df["value"], errors="coerce")
+        # display label per normalized name (first spelling seen), in input order for the substring fallback
+        first = ~norm.duplicated()
+        self.labels = dict(zip(norm[first], state[first]))
+
+        means = values.groupby([norm.values, df["year"].values]).mean().dropna()
+        names = means.index.get_level_values(0).values
+        self._years = means.index.get_level_values(1).values.astype(int)
+        self._values = means.values.astype(float)
+        starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]]) if len(names) else np.empty(0, dtype=int)
+        stops = np.r_[starts[1:], len(names)].astype(int)
+        self._slices = {names[a]: (int(a), int(b)) for a, b in zip(starts, stops)}
+        self._aliases = {}
+
+        total = values.groupby(df["year"].values).sum().dropna()
+        total.index = total.index.astype(int)
+        self._aggregate = total.sort_index()
+
+    def states(self) -> list:
+        """Display labels of the states in the frame, excluding any all-states rows."""
+        return sorted(label for label in self.labels.values() if label and not is_all_states_label(label))
+
+    def _resolve(self, state: str) -> str:
+        key = state.strip().lower()
+        if key in self.labels:
+            return key
+        if key not in self._aliases:
+            # try substring match on available states (resolved once per name)
+            matches = [c for c in self.labels if key in c]
+            if not matches:
+                raise ValueError(f"No data found for state matching '{state}'. Sample available states: {list(self.labels)[:20]}")
+            self._aliases[key] = matches[0]
+        return self._aliases[key]
+
+    def label(self, state: str) -> str:
+        """Spelling of a state as it appears in the data (after the same matching as get())."""
+        return self.labels[self._resolve(state)]
+
+    def get(self, state: str = None, aggregate: bool = False) -> pd.Series:
+        """Yearly series for a state (means of duplicate years) or the all-states sum."""
+        # aggregate requested explicitly or via the dashboard label
+        if aggregate or (state and is_all_states_label(state)):
+            if self._aggregate.empty:
+                raise ValueError("No data available to aggregate across states.")
+            return self._aggregate
+        if not state:
+            raise ValueError("No state provided and aggregate not requested.")
+        span = self._slices.get(self._resolve(state))
+        if span is None:
+            raise ValueError(f"No numeric values found for state '{state}'.")
+        a, b = span
+        return pd.Series(self._values[a:b], index=self._years[a:b], name="value")
+
+
+def prepare_series(df, state: str = None, aggregate: bool = False) -> pd.Series:
     """
     Prepare a yearly pd.Series indexed by integer year for the requested state or for the aggregate.
 
-    - df must contain columns: state, year, value
+    - df is a SeriesStore, or a frame with columns: state, year, value (indexed on the spot)
     - for aggregate: sums values across states per year
     - raises ValueError if no data found or series is empty
     """
-    if not set(["state", "year", "value"]).issubset(df.columns):
-        raise ValueError("Cleaned CSV must contain 'state', 'year', and 'value' columns.")
-
-    df = df.copy()
-    df["state"] = df["state"].astype(str).str.strip()
-    # aggregate requested explicitly or via the dashboard label
-    if aggregate or (state and is_all_states_label(state)):
-        grouped = df.groupby("year")["value"].sum().dropna()
-        if grouped.empty:
-            raise ValueError("No data available to aggregate across states.")
-        grouped.index = grouped.index.astype(int)
-        return grouped.sort_index()
-
-    if not state:
-        raise ValueError("No state provided and aggregate not requested.")
-
-    # exact match first (case-insensitive)
-    mask = df["state"].str.lower() == state.strip().lower()
-    df_s = df[mask]
-    if df_s.empty:
-        # try substring match on available states
-        candidates = df["state"].astype(str).str.lower().unique()
-        matches = [c for c in candidates if state.strip().lower() in c]
-        if matches:
-            df_s = df[df["state"].astype(str).str.lower() == matches[0]]
-        else:
-            raise ValueError(f"No data found for state matching '{state}'. Sample available states: {list(candidates)[:20]}")
-    grouped = df_s.groupby("year")["value"].mean().dropna()
-    if grouped.empty:
-        raise ValueError(f"No numeric values found for state '{state}'.")
-    grouped.index = grouped.index.astype(int)
-    return grouped.sort_index()
-
-
-def plot_forecast(history: pd.Series, forecast: pd.Series, state_label: str, method: str, out_path: str):
-    plt.figure(figsize=(8, 5))
-    plt.plot(history.index, history.values, marker="o", label="history")
-    plt.plot(forecast.index, forecast.values, marker="o", linestyle="--", label=f"forecast ({method})")
-    plt.title(f"Groundwater metric for {state_label} — forecast")
-    plt.xlabel("Year")
-    plt.ylabel("Value (dataset units)")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(out_path)
-    plt.close()
-
-
-def forecast_state(df: pd.DataFrame, state_label: str, periods: int, out_dir: str, aggregate: bool = False):
-    series = prepare_series(df, state=state_label, aggregate=aggregate)
+    store = df if isinstance(df, SeriesStore) else SeriesStore(df)
+    return store.get(state=state, aggregate=aggregate)
+
+
+def forecast_plot_job(history: pd.Series, forecast: pd.Series, state_label: str, method: str, out_path: str,
+                      lower=None, upper=None) -> dict:
+    """Describe the history + forecast figure as a render_plots job."""
+    job = {
+        "path": out_path,
+        "title": f"Groundwater metric for {state_label} — forecast",
+        "xlabel": "Year",
+        "ylabel": "Value (dataset units)",
+        "lines": [
+            {"x": list(history.index), "y": list(history.values), "label": "history"},
+            {"x": list(forecast.index), "y": list(forecast.values), "linestyle": "--", "label": f"forecast ({method})"},
+        ],
+    }
+    if lower is not None and upper is not None:
+        job["band"] = {"x": list(forecast.index), "lower": list(lower), "upper": list(upper), "label": "prediction interval"}
+    return job
+
+
+def plot_forecast(history: pd.Series, forecast: pd.Series, state_label: str, method: str, out_path: str,
+                  lower=None, upper=None):
+    render(forecast_plot_job(history, forecast, state_label, method, out_path, lower=lower, upper=upper))
+
+
+def forecast_frame(series: pd.Series, forecast: pd.Series, method: str, lower, upper) -> pd.DataFrame:
+    """History + forecast rows in the layout served by backend/serve_forecasts.py."""
+    hist_df = pd.DataFrame({"year": list(series.index), "value": list(series.values), "type": ["history"] * len(series)})
+    # method goes last: names like "arima(1,1,1)" contain commas, which naive CSV readers split on
+    f_df = pd.DataFrame({"year": list(forecast.index), "value": list(forecast.values), "type": ["forecast"] * len(forecast),
+                         "lower": list(lower), "upper": list(upper), "method": [method] * len(forecast)})
+    return pd.concat([hist_df, f_df], ignore_index=True)
+
+
+def forecast_state(df, state_label: str, periods: int, out_dir: str, aggregate: bool = False,
+                   interval: float = 0.95, plots: list = None, plot: bool = True, frames: list = None):
+    """
+    Forecast one state (or the aggregate) and write its CSV; returns (csv_path, plot_path).
+
+    The plot is drawn right away unless `plots` is a list, in which case its job is appended
+    there for a later render_plots.render_all() pass. plot=False skips it (plot_path is None).
+    When `frames` is a list, the rows are appended there (tagged for forecast_store) instead of
+    being written as a CSV, and csv_path is None.
+    """
+    store = df if isinstance(df, SeriesStore) else SeriesStore(df)
+    aggregate = aggregate or bool(state_label and is_all_states_label(state_label))
+    series = store.get(state=state_label, aggregate=aggregate)
     if series.empty:
         raise ValueError(f"No series data available for '{state_label}' to forecast.")
-    # choose_forecast may raise if series too short
-    forecast_ser, method = choose_forecast(series, periods=periods)
+    # choose_forecast_interval may raise if series too short
+    forecast_ser, method, lower, upper = choose_forecast_interval(series, periods=periods, alpha=1.0 - interval)
     ensure_dir(out_dir)
     cleaned_state_name = sanitize_name(state_label if not aggregate else "All_States_Aggregate")
     fname_csv = os.path.join(out_dir, f"{cleaned_state_name}_forecast.csv")
-    hist_df = pd.DataFrame({"year": list(series.index), "value": list(series.values), "type": ["history"] * len(series)})
-    f_df = pd.DataFrame({"year": list(forecast_ser.index), "value": list(forecast_ser.values), "type": ["forecast"] * len(forecast_ser)})
-    result_df = pd.concat([hist_df, f_df], ignore_index=True)
-    result_df.to_csv(fname_csv, index=False)
-    logging.info("Saved forecast CSV: %s", fname_csv)
+    result_df = forecast_frame(series, forecast_ser, method, lower, upper)
+    if frames is not None:
+        frames.append(tag_frame(result_df, "All States (Aggregate)" if aggregate else store.label(state_label)))
+        fname_csv = None
+    else:
+        write_csv_atomic(result_df, fname_csv)
+        logging.info("Saved forecast CSV: %s", fname_csv)
+    if not plot:
+        return fname_csv, None
     plot_path = os.path.join(out_dir, f"{cleaned_state_name}_forecast.png")
-    plot_forecast(series, forecast_ser, state_label if not aggregate else "All States (Aggregate)", method, plot_path)
-    logging.info("Saved plot: %s", plot_path)
+    job = forecast_plot_job(series, forecast_ser, state_label if not aggregate else "All States (Aggregate)", method,
+                            plot_path, lower=lower, upper=upper)
+    if plots is not None:
+        plots.append(job)
+    else:
+        render(job)
+        logging.info("Saved plot: %s", plot_path)
     return fname_csv, plot_path
 
 
+# worker-process copy of the SeriesStore, sent once per worker by the pool initializer
+_worker_store = None
+
+
+def preload_models():
+    """
+    Import the fitting libraries now rather than on the first fit. Called once by --watch, so
+    forked pool workers inherit them loaded, and by every pool worker (spawn platforms).
+    """
+    try:
+        import scipy.stats  # noqa: F401
+        import statsmodels.tsa.statespace.sarimax  # noqa: F401
+    except ImportError:
+        pass  # model.py falls back or reports the missing package when a fit needs it
+
+
+def _init_worker(store: SeriesStore):
+    global _worker_store
+    _worker_store = store
+    preload_models()
+
+
+def _store_task(task):
+    # long-lived pools (--watch) get the refresh's store with the tasks: one chunk carries it once
+    global _worker_store
+    store, state_task = task
+    _worker_store = store
+    return _state_task(state_task)
+
+
+def _state_task(task):
+    state, periods, out_dir, interval, plot, columnar = task
+    t0 = time.perf_counter()
+    try:
+        # plots come back as jobs and are rendered after every state's numbers are written
+        jobs = []
+        frames = [] if columnar else None
+        csv_p, plot_p = forecast_state(_worker_store, state, periods, out_dir, interval=interval, plots=jobs, plot=plot,
+                                       frames=frames)
+        return {"state": state, "status": "ok", "csv": csv_p, "plot": plot_p, "plot_jobs": jobs, "frames": frames or [],
+                "seconds": round(time.perf_counter() - t0, 3)}
+    except Exception as e:
+        return {"state": state, "status": "failed", "error": str(e), "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def read_states_file(path: str) -> list:
+    """One state per line; blank lines and lines starting with # are ignored."""
+    with open(path, "r", encoding="utf-8") as fh:
+        return [line.strip() for line in fh if line.strip() and not line.strip().startswith("#")]
+
+
+def forecast_states(store: SeriesStore, states: list, periods: int, out_dir: str, processes: int = None,
+                    interval: float = 0.95, plot: bool = True, columnar: bool = False, executor=None) -> list:
+    """
+    Run forecast_state for every state over a process pool and return one result dict per state
+    (status ok/failed, output paths or error, seconds, unrendered plot_jobs, and the tagged
+    frames when columnar). processes=1 runs inline. executor is a caller-owned pool to reuse
+    (--watch keeps one across refreshes); the store is then sent along with the tasks.
+    """
+    tasks = [(s, periods, out_dir, interval, plot, columnar) for s in states]
+    workers = min(processes or os.cpu_count() or 1, max(len(tasks), 1))
+    if executor is not None and tasks:
+        chunksize = -(-len(tasks) // workers)
+        return list(executor.map(_store_task, [(store, t) for t in tasks], chunksize=chunksize))
+    if workers <= 1:
+        _init_worker(store)
+        return [_state_task(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(store,)) as pool:
+        return list(pool.map(_state_task, tasks))
+
+
+MANIFEST_NAME = "forecast_manifest.json"
+
+
+def series_hash(series: pd.Series) -> str:
+    """Content hash of a yearly series (years and values)."""
+    h = hashlib.sha256()
+    h.update(np.asarray(series.index, dtype=np.int64).tobytes())
+    h.update(np.asarray(series.values, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+class Manifest:
+    """Per-series input hash, parameters and outputs of the last successful forecast."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        if os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf-8") as fh:
+                    self.entries = json.load(fh)
+            except (OSError, ValueError) as e:
+                logging.warning("Ignoring unreadable manifest %s (%s)", path, e)
+
+    @staticmethod
+    def _key(label: str) -> str:
+        return label.strip().lower()
+
+    def lookup(self, label: str, digest: str, params: dict):
+        """The recorded entry if the series is unchanged and its outputs exist, else None."""
+        entry = self.entries.get(self._key(label))
+        if not entry or entry.get("hash") != digest or entry.get("params") != params:
+            return None
+        if not all(os.path.exists(p) for p in entry.get("outputs", []) if p):
+            return None
+        return entry
+
+    def record(self, label: str, digest: str, params: dict, csv_path: str, plot_path: str):
+        self.entries[self._key(label)] = {"hash": digest, "params": params, "outputs": [csv_path, plot_path]}
+
+    def save(self):
+        write_json(self.entries, self.path, indent=2, sort_keys=True)
+
+
+def run_params(args) -> dict:
+    """Everything besides the input data that changes a series' outputs."""
+    return {"periods": args.periods, "interval": args.interval, "format": args.format, "plot": not args.no_plots,
+            "reconcile": args.reconcile}
+
+
+def fingerprint(store: SeriesStore, label: str, aggregate: bool = False):
+    """Input hash for a state, or None when the state cannot be resolved (the forecast reports why)."""
+    try:
+        return series_hash(store.get(state=label, aggregate=aggregate))
+    except ValueError:
+        return None
+
+
+def render_plots_stage(jobs: list, processes: int = None, executor=None):
+    if not jobs:
+        return
+    t0 = time.perf_counter()
+    results = render_all(jobs, processes=processes, executor=executor)
+    done = sum(1 for _, error in results if not error)
+    logging.info("Rendered %d/%d plots in %.1fs", done, len(jobs), time.perf_counter() - t0)
+
+
+def save_store(frames: list, args) -> str:
+    path = os.path.join(args.out, STORE_NAME)
+    if not frames:
+        return path
+    rows = write_store(frames, path, run_id=args.run_id)
+    logging.info("Saved %d series to forecast store %s (%d rows, run %s)", len(frames), path, rows, args.run_id)
+    return path
+
+
+AGGREGATE_LABEL = "All States (Aggregate)"
+RECONCILE_METHODS = ("bottom_up", "top_down", "ols", "wls_struct")
+
+
+def _read_output(path: str, label: str, args) -> pd.DataFrame:
+    if args.format == "parquet":
+        return read_store(path, state=label, columns=["year", "value", "type", "lower", "upper", "method"])
+    return pd.read_csv(path)
+
+
+def _forecast_rows(frame: pd.DataFrame):
+    return frame["type"].astype(str).str.lower() == "forecast"
+
+
+def reconcile_outputs(store: SeriesStore, outputs: list, args) -> list:
+    """
+    Rewrite this run's outputs so the total equals the sum of the states (reconcile.py).
+
+    outputs are the {"state", "csv", "plot"} dicts of the published series; a total built here
+    is appended to it. Only forecast years every state covers are reconciled. Projection methods
+    move the state forecasts as well and shift their bounds with the value, since reconciled
+    intervals would need the forecast error covariances; with bottom_up the total is rebuilt from
+    the state forecasts and has no bounds. Returns the plot jobs of the rewritten series.
+    """
+    method = args.reconcile
+    frames = {}
+    for r in outputs:
+        label = AGGREGATE_LABEL if is_all_states_label(r["state"]) else r["state"]
+        frames[label] = (r, _read_output(r["csv"], label, args))
+    rows = []
+    for label, (_, frame) in frames.items():
+        f = frame[_forecast_rows(frame)]
+        rows.append(pd.DataFrame({"state": label, "year": f["year"].astype(int).values, "value": f["value"].values}))
+    base = pd.concat(rows, ignore_index=True)
+    common = set.intersection(*(set(g["year"]) for _, g in base.groupby("state")))
+    if not common:
+        raise ValueError("The state forecasts share no forecast year.")
+    base = base[base["year"].isin(common)]
+    history = None
+    if method == "top_down":
+        history = pd.concat([pd.DataFrame({"state": s, "year": store.get(s).index, "value": store.get(s).values})
+                             for s in frames if s != AGGREGATE_LABEL], ignore_index=True)
+    coherent = reconcile_frame(base, ["state"], method=method, history=history)
+    coherent["state"] = coherent["state"].fillna(AGGREGATE_LABEL)
+
+    jobs, rewritten = [], []
+    for label, node in coherent.groupby("state", sort=False):
+        if method == "bottom_up" and label != AGGREGATE_LABEL:
+            continue  # bottom_up leaves the states as forecast
+        new = node.set_index("year")["value"]
+        if label in frames:
+            r, frame = frames[label]
+            frame = frame.copy()
+            fc = _forecast_rows(frame) & frame["year"].astype(int).isin(common)
+            shift = frame.loc[fc, "year"].astype(int).map(new).values - frame.loc[fc, "value"].values
+            for c in ("value", "lower", "upper"):
+                frame.loc[fc, c] = frame.loc[fc, c].values + shift
+            frame.loc[fc, "method"] = frame.loc[fc, "method"].astype(str) + f" reconciled ({method})"
+        else:
+            empty = np.full(len(new), np.nan)
+            frame = forecast_frame(store.get(aggregate=True), new, f"reconciled ({method})", empty, empty)
+            stem = sanitize_name("All_States_Aggregate")
+            r = {"state": label, "csv": os.path.join(args.out, STORE_NAME if args.format == "parquet" else f"{stem}_forecast.csv"),
+                 "plot": None if args.no_plots else os.path.join(args.out, f"{stem}_forecast.png")}
+            outputs.append(r)
+        if args.format == "parquet":
+            rewritten.append(tag_frame(frame, label))
+        else:
+            write_csv_atomic(frame, r["csv"])
+        if r["plot"]:
+            hist, fc = frame[~_forecast_rows(frame)], frame[_forecast_rows(frame)]
+            jobs.append(forecast_plot_job(pd.Series(hist["value"].values, index=hist["year"].values),
+                                          pd.Series(fc["value"].values, index=fc["year"].values), label,
+                                          str(fc["method"].iloc[-1]), r["plot"],
+                                          lower=fc["lower"].values, upper=fc["upper"].values))
+    if rewritten:
+        # one store write for every rewritten series
+        write_store(rewritten, os.path.join(args.out, STORE_NAME), run_id=args.run_id)
+    logging.info("Reconciled the total with %s over %d forecast years", method, len(common))
+    return jobs
+
+
+def run_many(store: SeriesStore, args, manifest: Manifest, include_aggregate: bool = False, executor=None) -> list:
+    states = read_states_file(args.states_file) if args.states_file else store.states()
+    # bottom_up builds the total from the states, so it is not fitted on its own
+    if (include_aggregate or args.reconcile) and args.reconcile != "bottom_up":
+        states = states + [AGGREGATE_LABEL]
+    params = run_params(args)
+    digests = {s: fingerprint(store, s) for s in states}
+    # projection methods couple every series, so a changed state changes all published outputs
+    coupled = args.reconcile not in (None, "bottom_up")
+    skipped, todo = [], []
+    for s in states:
+        entry = None if args.force or coupled or digests[s] is None else manifest.lookup(s, digests[s], params)
+        if entry:
+            csv_p, plot_p = entry["outputs"]
+            skipped.append({"state": s, "status": "skipped", "csv": csv_p, "plot": plot_p, "seconds": 0.0})
+        else:
+            todo.append(s)
+    logging.info("Forecasting %d states with %s processes (%d unchanged, skipped)", len(todo),
+                 args.processes or os.cpu_count(), len(skipped))
+    t0 = time.perf_counter()
+    results = forecast_states(store, todo, args.periods, args.out, processes=args.processes, interval=args.interval,
+                              plot=not args.no_plots, columnar=args.format == "parquet", executor=executor)
+    if args.format == "parquet":
+        frames = [f for r in results for f in r.pop("frames", [])]
+        path = save_store(frames, args)
+        for r in results:
+            if r["status"] == "ok":
+                r["csv"] = path
+    forecast_seconds = time.perf_counter() - t0
+    jobs = [job for r in results for job in r.pop("plot_jobs", [])]
+    if args.reconcile:
+        published = [{"state": r["state"], "csv": r["csv"], "plot": r["plot"]} for r in skipped + results if r["status"] != "failed"]
+        try:
+            rewritten = reconcile_outputs(store, published, args)
+        except Exception as e:
+            logging.error("Reconciliation (%s) failed, publishing the unreconciled forecasts: %s", args.reconcile, e)
+        else:
+            paths = {j["path"] for j in rewritten}
+            jobs = [j for j in jobs if j["path"] not in paths] + rewritten
+            if not any(is_all_states_label(r["state"]) for r in results):
+                agg = [r for r in published if r["state"] == AGGREGATE_LABEL]
+                results.extend({"state": AGGREGATE_LABEL, "status": "ok", "csv": a["csv"], "plot": a["plot"],
+                                "seconds": 0.0} for a in agg)
+    render_plots_stage(jobs, args.processes, executor=executor)
+    ok = [r for r in results if r["status"] == "ok"]
+    failed = [r for r in results if r["status"] != "ok"]
+    for r in failed:
+        logging.error("Forecast failed for state %s: %s", r["state"], r["error"])
+    for r in ok:
+        if r["state"] in digests:
+            manifest.record(r["state"], digests[r["state"]], params, r["csv"], r["plot"])
+    if ok:
+        manifest.save()
+    results = skipped + results
+    summary = {
+        "states": len(results),
+        "recomputed": len(ok),
+        "skipped": len(skipped),
+        "succeeded": len(ok),
+        "failed": len(failed),
+        "forecast_seconds": round(forecast_seconds, 3),
+        "plot_seconds": round(time.perf_counter() - t0 - forecast_seconds, 3),
+        "total_seconds": round(time.perf_counter() - t0, 3),
+        "state_seconds": round(sum(r["seconds"] for r in results), 3),
+        "results": results,
+    }
+    summary_path = os.path.join(args.out, "run_summary.json")
+    write_json(summary, summary_path, indent=2)
+    logging.info("%d recomputed, %d skipped, %d failed in %.1fs. Summary: %s", len(ok), len(skipped), len(failed),
+                 summary["total_seconds"], summary_path)
+    return [{"state": r["state"], "csv": r["csv"], "plot": r["plot"]} for r in skipped + ok]
+
+
+JOB_FIELDS = ("name", "state", "metric", "periods", "method", "interval")
+
+
+def load_jobs(path: str, defaults: dict) -> list:
+    """
+    Read a job spec: a list of jobs, or {"defaults": {...}, "jobs": [...]}. Each job needs a state
+    ("All States (Aggregate)" for the total) and may set name, metric, periods, method (auto or a
+    model.FORECASTERS name) and interval. YAML needs PyYAML; JSON works out of the box.
+    """
+    with open(path, "r", encoding="utf-8") as fh:
+        if path.lower().endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("Reading a YAML job spec needs PyYAML (pip install pyyaml); use a .json spec instead.")
+            spec = yaml.safe_load(fh)
+        else:
+            spec = json.load(fh)
+    if isinstance(spec, dict):
+        defaults = {**defaults, **(spec.get("defaults") or {})}
+        spec = spec.get("jobs")
+    if not isinstance(spec, list) or not spec:
+        raise ValueError(f"Job spec {path} must contain a non-empty list of jobs.")
+    jobs = []
+    for i, raw in enumerate(spec):
+        if not isinstance(raw, dict) or not raw.get("state"):
+            raise ValueError(f"Job {i} in {path} must be a mapping with a 'state'.")
+        unknown = set(raw) - set(JOB_FIELDS)
+        if unknown:
+            raise ValueError(f"Job {i} in {path} has unknown fields {sorted(unknown)}; allowed: {list(JOB_FIELDS)}.")
+        job = {**defaults, **raw}
+        job["periods"] = int(job["periods"])
+        job["interval"] = float(job["interval"])
+        job["metric"] = str(job["metric"]).strip() if job.get("metric") else ""
+        if job["method"] != "auto" and job["method"] not in FORECASTERS:
+            raise ValueError(f"Job {i} in {path}: unknown method '{job['method']}'. Choose auto or one of {sorted(FORECASTERS)}.")
+        jobs.append(job)
+    return jobs
+
+
+def job_output_name(job: dict, default_periods: int) -> str:
+    if job.get("name"):
+        return sanitize_name(job["name"])
+    aggregate = is_all_states_label(job["state"])
+    name = sanitize_name("All_States_Aggregate" if aggregate else job["state"])
+    if job["metric"]:
+        name += "_" + sanitize_name(job["metric"])
+    if job["method"] != "auto":
+        name += "_" + sanitize_name(job["method"])
+    if job["periods"] != default_periods:
+        name += f"_{job['periods']}y"
+    return name
+
+
+def _series_task(task):
+    """Worker: one shared fit for every job asking for this (series, method, interval)."""
+    series, periods, method, alpha = task
+    t0 = time.perf_counter()
+    try:
+        if method == "auto":
+            f, used, lower, upper = choose_forecast_interval(series, periods=periods, alpha=alpha)
+        else:
+            f, lower, upper = forecast_interval(series, periods=periods, method=method, alpha=alpha)
+            used = method
+        return {"forecast": f, "method": used, "lower": np.asarray(lower, dtype=float),
+                "upper": np.asarray(upper, dtype=float), "seconds": time.perf_counter() - t0}
+    except Exception as e:
+        return {"error": str(e), "seconds": time.perf_counter() - t0}
+
+
+def run_jobs(df: pd.DataFrame, args) -> int:
+    """Run a --jobs spec against the loaded frame; returns the number of jobs that succeeded."""
+    t0 = time.perf_counter()
+    defaults = {"metric": "", "periods": args.periods, "method": "auto", "interval": args.interval}
+    jobs = load_jobs(args.jobs, defaults)
+    names = [job_output_name(j, args.periods) for j in jobs]
+    clashes = sorted({n for n in names if names.count(n) > 1})
+    if clashes:
+        raise ValueError(f"Several jobs would write {clashes}; give them distinct 'name' fields.")
+
+    # one SeriesStore for the whole frame plus one per metric, grouped once
+    stores = {"": SeriesStore(df)}
+    if "metric" in df.columns:
+        for m, g in df.groupby(df["metric"].astype(str).str.strip().str.lower()):
+            stores[m] = SeriesStore(g)
+
+    # dedupe: jobs on the same series, method and interval share a fit at their longest horizon
+    work, series_of, report = {}, {}, []
+    for job, name in zip(jobs, names):
+        entry = {"name": name, "state": job["state"], "metric": job["metric"], "periods": job["periods"],
+                 "method": job["method"], "interval": job["interval"]}
+        report.append(entry)
+        store = stores.get(job["metric"].lower())
+        if store is None:
+            entry.update(status="failed", error=f"No data for metric '{job['metric']}'.")
+            continue
+        aggregate = is_all_states_label(job["state"])
+        label = "All States (Aggregate)" if aggregate else job["state"]
+        try:
+            series_key = (job["metric"].lower(), "" if aggregate else store.label(label).lower())
+            if series_key not in series_of:
+                series_of[series_key] = (label if aggregate else store.label(label), store.get(state=label, aggregate=aggregate))
+        except ValueError as e:
+            entry.update(status="failed", error=str(e))
+            continue
+        key = series_key + (job["method"], job["interval"])
+        work[key] = max(work.get(key, 0), job["periods"])
+        entry["_work"] = key
+    keys = list(work)
+    tasks = [(series_of[k[:2]][1], work[k], k[2], 1.0 - k[3]) for k in keys]
+    logging.info("%d jobs -> %d series fits over %s processes", len(jobs), len(tasks), args.processes or os.cpu_count())
+    t_fit = time.perf_counter()
+    fits = dict(zip(keys, map_tasks(_series_task, tasks, processes=args.processes)))
+    fit_seconds = time.perf_counter() - t_fit
+    shared = {k: sum(1 for e in report if e.get("_work") == k) for k in keys}
+
+    # --format parquet: every job lands in the run's store, keyed like run_many by (state, metric)
+    columnar = args.format == "parquet"
+    store_path = os.path.join(args.out, STORE_NAME)
+    frames, stored = [], set()
+    plot_jobs = []
+    for job, entry in zip(jobs, report):
+        key = entry.pop("_work", None)
+        if key is None:
+            continue
+        fit = fits[key]
+        entry.update(fit_seconds=round(fit["seconds"], 3), shared_by=shared[key])
+        if "error" in fit:
+            entry.update(status="failed", error=fit["error"])
+            continue
+        t_write = time.perf_counter()
+        label, series = series_of[key[:2]]
+        p = job["periods"]
+        forecast = fit["forecast"].iloc[:p]
+        lower, upper = fit["lower"][:p], fit["upper"][:p]
+        frame = forecast_frame(series, forecast, fit["method"], lower, upper)
+        if columnar:
+            ident = (label, job["metric"])
+            if ident in stored:
+                entry.update(status="failed", error=f"Another job already stores {ident} in {STORE_NAME}; "
+                                                    "the store keeps one forecast per (state, metric), use --format csv.")
+                continue
+            stored.add(ident)
+            frames.append(tag_frame(frame, *ident))
+            csv_path = store_path
+        else:
+            csv_path = os.path.join(args.out, f"{entry['name']}_forecast.csv")
+            write_csv_atomic(frame, csv_path)
+        plot_path = None
+        if not args.no_plots:
+            plot_path = os.path.join(args.out, f"{entry['name']}_forecast.png")
+            title = label if not job["metric"] else f"{label} ({job['metric']})"
+            plot_jobs.append(forecast_plot_job(series, forecast, title, fit["method"], plot_path, lower=lower, upper=upper))
+        entry.update(status="ok", method_used=fit["method"], csv=csv_path, plot=plot_path,
+                     write_seconds=round(time.perf_counter() - t_write, 3))
+    if frames:
+        save_store(frames, args)
+    render_plots_stage(plot_jobs, args.processes)
+
+    ok = sum(1 for e in report if e["status"] == "ok")
+    for e in report:
+        if e["status"] != "ok":
+            logging.error("Job %s failed: %s", e["name"], e["error"])
+    summary = {
+        "spec": args.jobs,
+        "jobs": len(report),
+        "succeeded": ok,
+        "failed": len(report) - ok,
+        "series_fits": len(tasks),
+        "fit_seconds": round(fit_seconds, 3),
+        "total_seconds": round(time.perf_counter() - t0, 3),
+        "results": report,
+    }
+    report_path = os.path.join(args.out, "jobs_report.json")
+    write_json(summary, report_path, indent=2)
+    logging.info("%d/%d jobs succeeded (%d fits) in %.1fs. Report: %s", ok, len(report), len(tasks),
+                 summary["total_seconds"], report_path)
+    return ok
+
+
+def file_signature(path: str):
+    """(mtime_ns, size) of a file, or None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def watch(args):
+    """
+    Refresh forecasts whenever the cleaned CSV changes, until interrupted.
+
+    The process (imports, model caches) stays up between refreshes and the SeriesStore is only
+    rebuilt when the file signature changes; a change is acted on once the signature has stayed
+    the same for --settle seconds, so a file that is still being written is not read. One worker
+    pool serves every refresh (forecasts and plots), with the model libraries imported once per
+    worker; it is only replaced if a worker dies. A refresh that fails is logged and retried at
+    the next poll; the watch keeps running.
+    """
+    ensure_dir(args.out)
+    preload_models()
+    manifest = Manifest(os.path.join(args.out, MANIFEST_NAME))
+    last = None
+    workers = args.processes or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=preload_models) if workers > 1 else None
+    logging.info("Watching %s every %.0fs (Ctrl+C to stop)", args.clean, args.poll)
+    try:
+        while True:
+            sig = file_signature(args.clean)
+            if sig is not None and sig != last:
+                time.sleep(args.settle)
+                if file_signature(args.clean) != sig:
+                    continue
+                try:
+                    store = SeriesStore(pd.read_csv(args.clean))
+                except Exception as e:
+                    logging.error("Failed to load %s: %s (waiting for the next change)", args.clean, e)
+                    last = sig
+                    continue
+                logging.info("Change detected in %s; refreshing forecasts", args.clean)
+                args.run_id = new_run_id()
+                try:
+                    run_many(store, args, manifest, include_aggregate=not args.states_file, executor=pool)
+                except BrokenProcessPool:
+                    logging.exception("A worker died during the refresh; restarting the pool and retrying at the next poll")
+                    pool.shutdown(wait=False)
+                    pool = ProcessPoolExecutor(max_workers=workers, initializer=preload_models)
+                except Exception:
+                    logging.exception("Refresh failed; retrying at the next poll")
+                else:
+                    last = sig
+            time.sleep(args.poll)
+    except KeyboardInterrupt:
+        logging.info("Watch stopped.")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
 def main(args):
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    if args.watch:
+        watch(args)
+        return
     try:
         df = pd.read_csv(args.clean)
     except FileNotFoundError:
@@ -142,22 +804,57 @@ def main(args):
         logging.error("Failed to read cleaned CSV: %s (%s)", args.clean, e)
         sys.exit(3)
 
+    args.run_id = new_run_id()
+    if args.jobs:
+        ensure_dir(args.out)
+        try:
+            succeeded = run_jobs(df, args)
+        except (OSError, ValueError) as e:
+            logging.error("Job spec failed: %s", e)
+            sys.exit(3)
+        if not succeeded:
+            logging.error("No jobs succeeded. See %s for details.", os.path.join(args.out, "jobs_report.json"))
+            sys.exit(4)
+        return
+
+    try:
+        store = SeriesStore(df)
+    except ValueError as e:
+        logging.error("%s", e)
+        sys.exit(3)
+    del df
+
     ensure_dir(args.out)
+    manifest = Manifest(os.path.join(args.out, MANIFEST_NAME))
     results = []
 
     # Determine whether to do aggregate/All states
-    if args.aggregate or args.all:
-        try:
-            csv_p, plot_p = forecast_state(df, "All States (Aggregate)", args.periods, args.out, aggregate=True)
-            results.append({"state": "All States (Aggregate)", "csv": csv_p, "plot": plot_p})
-        except Exception as e:
-            logging.error("Aggregate forecast failed: %s", e)
+    if args.all_states or args.states_file:
+        results.extend(run_many(store, args, manifest))
     else:
+        aggregate = args.aggregate or args.all
+        label = "All States (Aggregate)" if aggregate else args.state
+        params = run_params(args)
+        digest = fingerprint(store, label, aggregate=aggregate)
+        entry = None if args.force or digest is None else manifest.lookup(label, digest, params)
+        frames = [] if args.format == "parquet" else None
         try:
-            csv_p, plot_p = forecast_state(df, args.state, args.periods, args.out, aggregate=False)
-            results.append({"state": args.state, "csv": csv_p, "plot": plot_p})
+            if entry:
+                csv_p, plot_p = entry["outputs"]
+                logging.info("Input for %s unchanged since the last run; outputs kept (use --force to recompute).", label)
+            else:
+                csv_p, plot_p = forecast_state(store, label, args.periods, args.out, aggregate=aggregate,
+                                               interval=args.interval, plot=not args.no_plots, frames=frames)
+                if frames:
+                    csv_p = save_store(frames, args)
+                manifest.record(label, digest, params, csv_p, plot_p)
+                manifest.save()
+            results.append({"state": label, "csv": csv_p, "plot": plot_p})
         except Exception as e:
-            logging.error("Forecast failed for state %s: %s", args.state, e)
+            if aggregate:
+                logging.error("Aggregate forecast failed: %s", e)
+            else:
+                logging.error("Forecast failed for state %s: %s", label, e)
 
     logging.info("Completed forecasts for %d items.", len(results))
     if not results:
@@ -176,5 +873,21 @@ if __name__ == "__main__":
     parser.add_argument("--out", default="data/forecasts", help="Output folder for forecasts and plots.")
     parser.add_argument("--aggregate", action="store_true", help="Aggregate across all states and forecast the total (sum) time series.")
     parser.add_argument("--all", action="store_true", help="Alias for --aggregate (keeps old interface).")
+    parser.add_argument("--all-states", action="store_true", help="Forecast every state in the cleaned CSV in one run.")
+    parser.add_argument("--states-file", default=None, help="Forecast the states listed in this file (one per line).")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes for --all-states/--states-file and plot rendering (default: CPU count).")
+    parser.add_argument("--no-plots", action="store_true", help="Only write forecast CSVs; skip PNG rendering.")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv",
+                        help="csv: one <State>_forecast.csv per state; parquet: every series in <out>/forecasts.parquet.")
+    parser.add_argument("--jobs", default=None, help="JSON/YAML spec of (state, metric, periods, method) jobs to run in one pass.")
+    parser.add_argument("--watch", action="store_true", help="Keep running and refresh forecasts whenever --clean changes.")
+    parser.add_argument("--poll", type=float, default=30.0, help="With --watch: seconds between checks of the cleaned CSV.")
+    parser.add_argument("--settle", type=float, default=2.0, help="With --watch: seconds the file must stay unchanged before it is read.")
+    parser.add_argument("--force", action="store_true", help="Recompute every series, ignoring the manifest of unchanged inputs.")
+    parser.add_argument("--reconcile", choices=RECONCILE_METHODS, default=None,
+                        help="With --all-states/--watch: make the published total coherent with the states (see reconcile.py).")
+    parser.add_argument("--interval", type=float, default=0.95, help="Coverage of the forecast prediction interval (lower/upper columns).")
     args = parser.parse_args()
+    if args.reconcile and (args.states_file or not (args.all_states or args.watch)):
+        parser.error("--reconcile needs every state: use it with --all-states or --watch (not --states-file).")
     main(args)
\ No newline at end of file
@@ -10,6 +10,8 @@ This corrected version:
 
 Usage:
     python src/process_data.py --raw_dir data/raw --out data/processed/cleaned_groundwater.csv --debug
+    # refresh and precompute every served forecast (see warm_cache.py)
+    python src/process_data.py --raw_dir data/raw --out data/processed/cleaned_groundwater.csv --warm
 """
 import argparse
 import glob
@@ -266,6 +268,13 @@ def process_all(raw_dir, out_csv, debug=False):
 
 def main(args):
     out = process_all(args.raw_dir, args.out, debug=args.debug)
+    if args.warm and out:
+        import logging
+
+        from warm_cache import warm
+
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+        print("Warm-up:", warm(out, out_dir=args.forecast_dir, periods=args.periods, cache_dir=args.cache_dir))
     print("Done.")
 
 
@@ -274,5 +283,9 @@ if __name__ == "__main__":
     parser.add_argument("--raw_dir", default="data/raw", help="Directory containing raw downloaded files.")
     parser.add_argument("--out", default="data/processed/cleaned_groundwater.csv", help="Output cleaned CSV path.")
     parser.add_argument("--debug", action="store_true", help="Print debugging info and dataset sample.")
+    parser.add_argument("--warm", action="store_true", help="Precompute all served forecasts from the cleaned CSV afterwards.")
+    parser.add_argument("--forecast-dir", default="data/forecasts", help="With --warm: forecast directory to fill.")
+    parser.add_argument("--periods", type=int, default=5, help="With --warm: forecast horizon.")
+    parser.add_argument("--cache-dir", default=None, help="With --warm: also fill the ARIMA fit cache here.")
     args = parser.parse_args()
     main(args)
\ No newline at end of file
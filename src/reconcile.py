@@ -0,0 +1,201 @@
+# path: src/reconcile.py
+"""
+Hierarchical forecast reconciliation (e.g. blocks -> districts -> states -> national total).
+
+Forecasting each level separately gives an aggregate that does not equal the sum of its parts.
+This module builds the summing matrix S once from the bottom-level keys and makes all base
+forecasts coherent in one linear-algebra step.
+
+Methods:
+ - bottom_up:  aggregates are the sums of bottom-level forecasts (no aggregate fit needed)
+ - top_down:   the total forecast is split by historical proportions
+ - ols:        least-squares projection onto the coherent subspace (W = I)
+ - wls_struct: weighted projection with W = number of bottom series under each node
+ - mint:       MinT with a diagonal covariance; pass per-node residual variances
+
+The projection methods use y~ = y - W C'(C W C')^-1 C y with C = [I, -S_agg], so the only
+dense solve is in the number of aggregate nodes, not the number of bottom series. With
+block-level bottoms the system stays small (national + states + districts) and S is sparse.
+
+Frames: bottom rows have every level column filled; aggregate rows leave the lower levels
+empty (NaN), and the national total leaves all of them empty. The pipeline's total label
+("All States (Aggregate)", see TOTAL_LABELS) in the top level column also marks the total.
+
+predict.py --all-states --reconcile METHOD runs this on every run, so the published total is
+coherent with the state forecasts.
+
+Usage:
+    python src/predict.py --clean data/processed/cleaned_groundwater.csv --all-states --format parquet
+    python src/reconcile.py --forecasts data/forecasts/forecasts.parquet --levels state --method ols \
+        --out data/forecasts/reconciled_forecasts.csv
+"""
+import argparse
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy import linalg, sparse
+
+METHODS = ("bottom_up", "top_down", "ols", "wls_struct", "mint")
+# labels predict.py, warm_cache.py and the forecast store use for the national total
+TOTAL_LABELS = ("all states", "all states (aggregate)", "all_states_aggregate", "all_states")
+
+
+class Hierarchy:
+    """Summing matrix for a hierarchy, built once from the bottom-level key tuples."""
+
+    def __init__(self, bottom_keys: Sequence[tuple]):
+        bottom = sorted(set(tuple(k) for k in bottom_keys))
+        if not bottom:
+            raise ValueError("Hierarchy needs at least one bottom-level series.")
+        depth = len(bottom[0])
+        if any(len(k) != depth for k in bottom):
+            raise ValueError("All bottom-level keys must have the same number of levels.")
+        aggregates = sorted({k[:i] for k in bottom for i in range(depth)}, key=lambda k: (len(k), k))
+        agg_index = {k: i for i, k in enumerate(aggregates)}
+        rows, cols = [], []
+        for j, k in enumerate(bottom):
+            for i in range(depth):
+                rows.append(agg_index[k[:i]])
+                cols.append(j)
+        self.bottom = bottom
+        self.aggregates = aggregates
+        self.nodes = aggregates + bottom
+        self.S_agg = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(aggregates), len(bottom)))
+        self.S = sparse.vstack([self.S_agg, sparse.identity(len(bottom), format="csr")], format="csr")
+        self._factors: Dict[str, tuple] = {}
+
+    def _weights(self, method: str, variances: Optional[np.ndarray]) -> np.ndarray:
+        if method == "ols":
+            return np.ones(len(self.nodes))
+        if method == "wls_struct":
+            return np.asarray(self.S.sum(axis=1)).ravel()
+        if variances is None:
+            raise ValueError("mint reconciliation needs per-node residual variances.")
+        w = np.asarray(variances, dtype=float)
+        if w.shape != (len(self.nodes),) or np.any(~np.isfinite(w)) or np.any(w <= 0):
+            raise ValueError("variances must be positive and given for every node (Hierarchy.nodes order).")
+        return w
+
+    def _factor(self, method: str, w: np.ndarray):
+        # ols / wls_struct weights depend only on the hierarchy, so their factorization is reused
+        if method in self._factors:
+            return self._factors[method]
+        n_agg = len(self.aggregates)
+        w_agg, w_b = w[:n_agg], w[n_agg:]
+        m = (self.S_agg @ sparse.diags(w_b) @ self.S_agg.T).toarray() + np.diag(w_agg)
+        factor = linalg.cho_factor(m)
+        if method != "mint":
+            self._factors[method] = factor
+        return factor
+
+    def reconcile(self, base: np.ndarray, method: str = "bottom_up", variances: Optional[np.ndarray] = None,
+                  proportions: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Reconcile base forecasts given as a (nodes x horizons) array in Hierarchy.nodes order.
+        Returns a coherent array of the same shape.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown reconciliation method '{method}'. Choose from {METHODS}.")
+        y = np.asarray(base, dtype=float)
+        if y.ndim == 1:
+            y = y[:, None]
+        n_agg = len(self.aggregates)
+        if method == "bottom_up":
+            return self.S @ y[n_agg:]
+        if method == "top_down":
+            if proportions is None:
+                raise ValueError("top_down reconciliation needs bottom-level proportions.")
+            p = np.asarray(proportions, dtype=float)
+            return self.S @ (p[:, None] * y[0])
+        w = self._weights(method, variances)
+        lam = linalg.cho_solve(self._factor(method, w), y[:n_agg] - self.S_agg @ y[n_agg:])
+        bottom = y[n_agg:] + w[n_agg:, None] * (self.S_agg.T @ lam)
+        # summing the adjusted bottom level is exactly coherent and equal to the projection
+        return self.S @ bottom
+
+
+def _node_key(labels: tuple) -> tuple:
+    if labels and isinstance(labels[0], str) and labels[0].strip().lower() in TOTAL_LABELS:
+        return ()
+    key = []
+    for label in labels:
+        if pd.isna(label):
+            break
+        key.append(label)
+    return tuple(key)
+
+
+def historical_proportions(history: pd.DataFrame, hierarchy: Hierarchy, levels: List[str], value_col: str = "value") -> np.ndarray:
+    """Average share of each bottom series in the yearly total (bottom rows of `history` only)."""
+    bottom = history.dropna(subset=levels)
+    wide = bottom.pivot_table(index=levels, columns="year", values=value_col, aggfunc="sum")
+    wide.index = [k if isinstance(k, tuple) else (k,) for k in wide.index]
+    wide = wide.reindex(hierarchy.bottom)
+    shares = wide / wide.sum(axis=0)
+    p = shares.mean(axis=1).fillna(0.0).values
+    return p / p.sum() if p.sum() > 0 else np.full(len(p), 1.0 / len(p))
+
+
+def reconcile_frame(forecasts: pd.DataFrame, levels: Sequence[str], method: str = "bottom_up",
+                    variances: Optional[Dict[tuple, float]] = None, history: Optional[pd.DataFrame] = None,
+                    value_col: str = "value") -> pd.DataFrame:
+    """
+    Reconcile a long forecast frame (level columns, year, value) across its hierarchy.
+
+    Returns one row per node and year with the reconciled value and a `reconciliation` column.
+    `variances` maps node keys (tuples, () for the total) to residual variances for mint;
+    `history` provides the proportions for top_down.
+    """
+    levels = list(levels)
+    keyed = forecasts.assign(_node=[_node_key(t) for t in forecasts[levels].itertuples(index=False, name=None)])
+    if history is not None:
+        # the total's own history must not count as one more bottom series
+        history = history[[_node_key(t) != () for t in history[levels].itertuples(index=False, name=None)]]
+    bottom_keys = [k for k in keyed["_node"].unique() if len(k) == len(levels)]
+    hierarchy = Hierarchy(bottom_keys)
+    years = np.sort(keyed["year"].unique())
+    pos = {k: i for i, k in enumerate(hierarchy.nodes)}
+    base = np.full((len(hierarchy.nodes), len(years)), np.nan)
+    rows = keyed["_node"].map(pos)
+    known = rows.notna()
+    base[rows[known].astype(int).values, np.searchsorted(years, keyed.loc[known, "year"].values)] = keyed.loc[known, value_col].values
+    n_agg = len(hierarchy.aggregates)
+    if method != "bottom_up" and np.isnan(base[:n_agg] if method != "top_down" else base[:1]).any():
+        raise ValueError(f"{method} reconciliation needs base forecasts for the aggregate nodes.")
+
+    node_var = None
+    if method == "mint":
+        if variances is None:
+            raise ValueError("mint reconciliation needs per-node residual variances.")
+        node_var = np.array([variances.get(k, np.nan) for k in hierarchy.nodes], dtype=float)
+    proportions = historical_proportions(history, hierarchy, levels, value_col) if method == "top_down" and history is not None else None
+    coherent = hierarchy.reconcile(base, method=method, variances=node_var, proportions=proportions)
+
+    labels = [list(node) + [np.nan] * (len(levels) - len(node)) for node in hierarchy.nodes]
+    out = pd.DataFrame(np.repeat(np.array(labels, dtype=object), len(years), axis=0), columns=levels)
+    out["year"] = np.tile(years.astype(int), len(hierarchy.nodes))
+    out[value_col] = coherent.ravel()
+    out["reconciliation"] = method
+    return out
+
+
+def main(args):
+    forecasts = pd.read_parquet(args.forecasts) if args.forecasts.endswith(".parquet") else pd.read_csv(args.forecasts)
+    if "type" in forecasts.columns:
+        forecasts = forecasts[forecasts["type"].astype(str).str.lower() == "forecast"]
+    history = pd.read_csv(args.history) if args.history else None
+    out = reconcile_frame(forecasts, args.levels, method=args.method, history=history)
+    out.to_csv(args.out, index=False)
+    print("Saved reconciled forecasts to:", args.out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile forecasts across a state/district/block hierarchy.")
+    parser.add_argument("--forecasts", required=True, help="Long CSV (or the predict.py --format parquet store) with level columns, year and value.")
+    parser.add_argument("--levels", nargs="+", default=["state"], help="Level columns from top to bottom (e.g. state district block).")
+    parser.add_argument("--method", choices=METHODS, default="bottom_up", help="Reconciliation method.")
+    parser.add_argument("--history", default=None, help="Cleaned history CSV (needed for top_down proportions).")
+    parser.add_argument("--out", default="data/forecasts/reconciled_forecasts.csv", help="Output CSV path.")
+    args = parser.parse_args()
+    main(args)
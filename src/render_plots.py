@@ -0,0 +1,108 @@
+# path: src/render_plots.py
+"""
+Deferred, parallel rendering of forecast plots.
+
+Forecast scripts describe each figure as a plain dict (a "plot job") while they compute numbers,
+write their CSVs first, and only then hand the jobs to render_all(). Rasterization is what
+dominates wall time, so it runs as its own stage:
+ - the non-interactive Agg backend is forced (no display needed, safe in worker processes)
+ - jobs are spread over a process pool (--processes in the calling script)
+ - each worker keeps one figure/axes and clears it between jobs instead of building a new figure
+
+Plot job keys:
+    path      output PNG path
+    title, xlabel, ylabel
+    lines     list of {"x", "y", plus optional "label", "marker", "linestyle"}
+    band      optional {"x", "lower", "upper", "label"} drawn with fill_between
+    figsize   optional (width, height) in inches, default (8, 5)
+    legend    optional bool, default True when any line or band has a label
+
+Usage (from another script):
+    from render_plots import render_all
+    jobs.append({"path": "out.png", "title": "...", "lines": [{"x": years, "y": values}]})
+    render_all(jobs, processes=4)
+"""
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+
+from atomic_io import atomic_path  # noqa: E402
+
+DEFAULT_FIGSIZE = (8, 5)
+
+# one figure per process, reused across jobs
+_fig = None
+_ax = None
+
+
+def _axes(figsize):
+    global _fig, _ax
+    if _fig is None:
+        _fig, _ax = plt.subplots(figsize=figsize)
+    else:
+        _ax.clear()
+        _fig.set_size_inches(*figsize)
+    return _fig, _ax
+
+
+def render(job: dict) -> str:
+    """Draw one plot job onto the process' shared figure and save it; returns the path."""
+    fig, ax = _axes(tuple(job.get("figsize") or DEFAULT_FIGSIZE))
+    labelled = False
+    for line in job.get("lines", []):
+        ax.plot(line["x"], line["y"], marker=line.get("marker", "o"), linestyle=line.get("linestyle", "-"),
+                label=line.get("label"))
+        labelled = labelled or bool(line.get("label"))
+    band = job.get("band")
+    if band is not None and not np.isnan(np.asarray(band["lower"], dtype=float)).all():
+        ax.fill_between(band["x"], band["lower"], band["upper"], alpha=0.2, label=band.get("label"))
+        labelled = labelled or bool(band.get("label"))
+    ax.set_title(job.get("title", ""))
+    ax.set_xlabel(job.get("xlabel", ""))
+    ax.set_ylabel(job.get("ylabel", ""))
+    if job.get("legend", labelled):
+        ax.legend()
+    ax.grid(True)
+    fig.tight_layout()
+    if os.path.dirname(job["path"]):
+        os.makedirs(os.path.dirname(job["path"]), exist_ok=True)
+    # write beside the target and swap in, so a served PNG is never half-written
+    with atomic_path(job["path"]) as tmp:
+        fig.savefig(tmp, format=os.path.splitext(job["path"])[1].lstrip(".") or "png")
+    return job["path"]
+
+
+def _render_task(job: dict):
+    try:
+        return render(job), None
+    except Exception as e:
+        return job.get("path"), str(e)
+
+
+def render_all(jobs: List[dict], processes: Optional[int] = None, executor: Optional[Executor] = None) -> List[tuple]:
+    """
+    Render every job, over a process pool when there is more than one worker.
+    executor is a caller-owned pool to render on instead of starting one (predict.py --watch).
+    Returns (path, error) per job in input order; error is None on success.
+    """
+    if not jobs:
+        return []
+    workers = min(processes or os.cpu_count() or 1, len(jobs))
+    if executor is not None:
+        results = list(executor.map(_render_task, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    elif workers <= 1:
+        results = [_render_task(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_task, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    for path, error in results:
+        if error:
+            logging.error("Plot failed for %s: %s", path, error)
+    return results
@@ -0,0 +1,246 @@
+# path: src/stream_forecast.py
+"""
+Out-of-core forecasting for panels too large to load at once (e.g. block-level series).
+
+Rows are read in pieces from one of:
+ - a long CSV (state[, well][, metric], year, value) read with pandas chunksize
+ - a partitioned Parquet dataset (a directory of files, e.g. one per state), one file at a time;
+   hive-style directory keys (state=Maharashtra/part-0.parquet) are added back as columns
+ - a SQL query, fetched through the DB-API cursor in chunks (sqlite path on the command line,
+   any connection from Python)
+and regrouped into chunks of at most --chunk-series complete series. A series is never split:
+the rows of the last series in a piece are held back until its key changes. That needs the
+input sorted by the key columns (ORDER BY them in SQL; CSV/Parquet files written sorted).
+Order is checked against the previous series' key only, so the check costs no memory: a key
+that sorts before its predecessor (e.g. one that shows up again after its series was
+forecast) raises an error.
+
+Each chunk goes through model.forecast_many and is appended to the output (CSV or Parquet)
+before the next one is read, so peak memory is bounded by the chunk size, not the panel size.
+One worker pool serves all chunks, so workers import statsmodels once per run.
+
+Usage:
+    python src/stream_forecast.py --csv data/processed/cleaned_blocks.csv --out data/forecasts/block_forecasts.csv
+    python src/stream_forecast.py --parquet-dir data/processed/blocks/ --out data/forecasts/block_forecasts.parquet
+    python src/stream_forecast.py --sqlite data/groundwater.db \
+        --query "SELECT state, metric, year, value FROM readings ORDER BY state, metric, year" --out data/forecasts/f.csv
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from model import DEFAULT_ALPHA, forecast_many, panel_keys
+
+OUTPUT_COLUMNS = ("year", "value", "method", "lower", "upper")
+
+
+def csv_pieces(path: str, rows: int = 200_000) -> Iterator[pd.DataFrame]:
+    yield from pd.read_csv(path, chunksize=rows)
+
+
+def parquet_pieces(path: str) -> Iterator[pd.DataFrame]:
+    """
+    One frame per Parquet file under `path` (recursively, in sorted path order). Keys that hive
+    partitioning keeps only in the directory names (state=.../) are restored as columns.
+    """
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(path, format="parquet", partitioning="hive")
+    for fragment in sorted(dataset.get_fragments(), key=lambda f: f.path):
+        frame = fragment.to_table().to_pandas()
+        for column, value in ds.get_partition_keys(fragment.partition_expression).items():
+            if column not in frame.columns:
+                frame[column] = value
+        yield frame
+
+
+def sql_pieces(conn, query: str, rows: int = 200_000) -> Iterator[pd.DataFrame]:
+    """Fetch a query through a DB-API cursor, `rows` at a time."""
+    cur = conn.cursor()
+    try:
+        cur.execute(query)
+        columns = [d[0] for d in cur.description]
+        while True:
+            batch = cur.fetchmany(rows)
+            if not batch:
+                break
+            yield pd.DataFrame.from_records(batch, columns=columns)
+    finally:
+        cur.close()
+
+
+def series_chunks(pieces: Iterable[pd.DataFrame], chunk_series: int = 2000) -> Iterator[pd.DataFrame]:
+    """
+    Regroup arbitrary row pieces into frames of at most chunk_series complete series.
+    The input must be sorted by the panel key columns (see the module docstring).
+    """
+    carry: Optional[pd.DataFrame] = None
+    last: Optional[tuple] = None
+    keys: List[str] = []
+    for piece in pieces:
+        if piece.empty:
+            continue
+        keys = keys or panel_keys(piece)
+        if not keys:
+            raise ValueError("Input must contain the panel key columns (state[, well][, metric]).")
+        # CSV chunks infer dtypes separately (a well id can be int in one chunk, str in the next):
+        # keys are text from here on, so runs and the order check see one dtype
+        piece = piece.astype({k: str for k in keys})
+        if carry is not None:
+            piece = pd.concat([carry, piece], ignore_index=True)
+        # one integer code per run of identical keys, in input order
+        changed = piece[keys].ne(piece[keys].shift()).any(axis=1)
+        run = changed.cumsum().values
+        # hold back the last series: its rows may continue in the next piece
+        complete = run < run[-1]
+        carry = piece[~complete]
+        ready = piece[complete]
+        for chunk in _split_runs(ready, run[complete], chunk_series):
+            last = _check_order(chunk, keys, last)
+            yield chunk
+    if carry is not None and len(carry):
+        _check_order(carry, keys, last)
+        yield carry
+
+
+def _split_runs(frame: pd.DataFrame, run, chunk_series: int) -> Iterator[pd.DataFrame]:
+    if frame.empty:
+        return
+    block = (run - run[0]) // chunk_series
+    for _, chunk in frame.groupby(block, sort=True):
+        yield chunk
+
+
+def _order_key(value) -> tuple:
+    # numeric keys (ids sorted as numbers) compare by value, before any other text
+    try:
+        return 0, float(value), ""
+    except (TypeError, ValueError):
+        return 1, 0.0, str(value)
+
+
+def _check_order(chunk: pd.DataFrame, keys: List[str], last: Optional[tuple]) -> tuple:
+    """Raise unless the chunk's series keys strictly increase from `last`; returns the chunk's last key."""
+    starts = chunk[keys].ne(chunk[keys].shift()).any(axis=1)
+    for key in chunk.loc[starts, keys].itertuples(index=False, name=None):
+        order = tuple(_order_key(v) for v in key)
+        if last is not None and not order > last[1]:
+            raise ValueError(f"Input is not sorted by {keys}: series {key} comes after {last[0]}.")
+        last = (key, order)
+    return last
+
+
+class OutputWriter:
+    """Append forecast frames to a CSV or Parquet file with a fixed column set."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = path.endswith(".parquet")
+        self._writer = None
+        self._columns: Optional[List[str]] = None
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def write(self, frame: pd.DataFrame, keys: List[str]):
+        if self._columns is None:
+            self._columns = list(keys) + list(OUTPUT_COLUMNS)
+        # lower/upper are dropped by forecast_many when a chunk has no intervals; keep the schema fixed
+        frame = frame.reindex(columns=self._columns)
+        frame["lower"] = frame["lower"].astype(float)
+        frame["upper"] = frame["upper"].astype(float)
+        if not self.parquet:
+            frame.to_csv(self.path, mode="a", header=not os.path.exists(self.path), index=False)
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def stream_forecast(pieces: Iterable[pd.DataFrame], out_path: str, periods: int = 5, chunk_series: int = 2000,
+                    processes: Optional[int] = None, method: str = "auto", arima_engine: str = "sarimax",
+                    fit_timeout: Optional[float] = None, alpha: Optional[float] = DEFAULT_ALPHA) -> dict:
+    """
+    Forecast every series from `pieces` chunk by chunk and append the results to out_path.
+    Returns a summary: chunks, series, rows written, timed-out series and elapsed seconds.
+    """
+    writer = OutputWriter(out_path)
+    summary = {"chunks": 0, "series": 0, "rows": 0, "timed_out": 0, "routes": {}}
+    t0 = time.perf_counter()
+    workers = processes or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for chunk in series_chunks(pieces, chunk_series=chunk_series):
+            keys = panel_keys(chunk)
+            n_series = len(chunk[keys].drop_duplicates())
+            result = forecast_many(chunk, periods=periods, processes=processes, method=method,
+                                   arima_engine=arima_engine, fit_timeout=fit_timeout, alpha=alpha, executor=pool)
+            writer.write(result, keys)
+            summary["chunks"] += 1
+            summary["series"] += n_series
+            summary["rows"] += len(result)
+            summary["timed_out"] += len(result.attrs.get("timed_out", []))
+            for route, n in result.attrs.get("routes", {}).items():
+                summary["routes"][route] = summary["routes"].get(route, 0) + n
+            logging.info("Chunk %d: %d series (%d total) in %.1fs", summary["chunks"], n_series,
+                         summary["series"], time.perf_counter() - t0)
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.shutdown()
+    summary["seconds"] = time.perf_counter() - t0
+    return summary
+
+
+def main(args):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    if args.csv:
+        pieces = csv_pieces(args.csv, rows=args.read_rows)
+    elif args.parquet_dir:
+        pieces = parquet_pieces(args.parquet_dir)
+    else:
+        import sqlite3
+
+        conn = sqlite3.connect(args.sqlite)
+        pieces = sql_pieces(conn, args.query, rows=args.read_rows)
+    summary = stream_forecast(pieces, args.out, periods=args.periods, chunk_series=args.chunk_series,
+                              processes=args.processes, method=args.method, arima_engine=args.arima_engine,
+                              fit_timeout=args.fit_timeout)
+    logging.info("Saved forecasts to: %s", args.out)
+    print(summary)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Forecast a large panel chunk by chunk with bounded memory.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", help="Long CSV ordered by the series key columns.")
+    source.add_argument("--parquet-dir", help="Parquet file or directory of partition files.")
+    source.add_argument("--sqlite", help="SQLite database to read with --query.")
+    parser.add_argument("--query", help="SQL query returning key columns, year and value, ORDER BY the key columns.")
+    parser.add_argument("--out", default="data/forecasts/stream_forecasts.csv", help="Output .csv or .parquet path.")
+    parser.add_argument("--periods", type=int, default=5, help="Number of future years to forecast.")
+    parser.add_argument("--chunk-series", type=int, default=2000, help="Series forecast per chunk.")
+    parser.add_argument("--read-rows", type=int, default=200_000, help="Rows read per CSV/SQL piece.")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes, shared by all chunks (default: CPU count).")
+    parser.add_argument("--method", default="auto", help="Forecast method passed to model.forecast_many.")
+    parser.add_argument("--arima-engine", default="sarimax", choices=("sarimax", "css"), help="ARIMA estimator.")
+    parser.add_argument("--fit-timeout", type=float, default=None, help="Seconds allowed per SARIMAX fit.")
+    args = parser.parse_args()
+    if args.sqlite and not args.query:
+        parser.error("--sqlite needs --query")
+    main(args)
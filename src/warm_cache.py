@@ -0,0 +1,209 @@
+# path: src/warm_cache.py
+"""
+Precompute every served forecast after a data refresh, so no dashboard request pays for a fit.
+
+For each (state[, metric]) series in the cleaned panel, plus the "All States (Aggregate)" total,
+the default-horizon forecast is computed with model.forecast_many over a process pool and
+written as <State>[_<metric>]_forecast.csv into the forecast directory that
+backend/serve_forecasts.py reads (same history/forecast layout as predict.py). Files are
+replaced atomically, so the server never reads a half-written forecast.
+
+With --cache-dir (or FORECAST_CACHE_DIR), the ARIMA fits land in the model.FitCache as well,
+so later predict.py / forecast_many runs on the same data are file reads. --verify checks that:
+it re-forecasts every series the way predict.py does (choose_forecast_interval at 95%) against
+the freshly written cache and reports how many fits that still needed (should be 0).
+
+With --model-dir (or FORECAST_MODEL_DIR), the terminal model state of every series is stored
+too (model.update_many), so serve_forecasts.py answers ?periods=N for any horizon without a fit.
+The states are built from the warm-up's own fits, read back from the fit cache (a "fits"
+directory under the model directory unless --cache-dir is given), so nothing is fitted twice.
+
+Progress is logged as series finish; the final summary reports counts and timing.
+
+Usage:
+    python src/warm_cache.py --clean data/processed/cleaned_groundwater.csv --out data/forecasts --periods 5
+    python src/warm_cache.py --clean data/processed/cleaned_groundwater.csv --cache-dir data/cache --verify
+    python src/warm_cache.py --clean data/processed/cleaned_groundwater.csv --model-dir data/models
+    python src/process_data.py --raw_dir data/raw --out data/processed/cleaned_groundwater.csv --warm
+"""
+import argparse
+import logging
+import os
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from model import (DEFAULT_ALPHA, FitCache, ModelStore, choose_forecast_interval, forecast_many, get_fit_cache,
+                   panel_keys, set_fit_cache, split_panel, update_many)
+from predict import sanitize_name, write_csv_atomic
+
+AGGREGATE_LABEL = "All States (Aggregate)"
+
+
+def with_aggregate(df: pd.DataFrame) -> pd.DataFrame:
+    """Append the all-states total (per metric, if any) as one more state, summed like predict.prepare_series."""
+    keys = [k for k in panel_keys(df) if k != "state"]
+    values = df.assign(value=pd.to_numeric(df["value"], errors="coerce"), year=pd.to_numeric(df["year"], errors="coerce"))
+    total = values.dropna(subset=["year", "value"]).groupby(keys + ["year"], sort=True)["value"].sum().reset_index()
+    total["state"] = AGGREGATE_LABEL
+    return pd.concat([df, total[df.columns.intersection(total.columns)]], ignore_index=True)
+
+
+def forecast_filename(key: tuple, key_names: list) -> str:
+    labels = dict(zip(key_names, key))
+    # predict.py names the aggregate file from "All_States_Aggregate", not the display label
+    name = sanitize_name("All_States_Aggregate" if labels["state"] == AGGREGATE_LABEL else labels["state"])
+    for k in key_names:
+        if k != "state":
+            name += "_" + sanitize_name(labels[k])
+    return f"{name}_forecast.csv"
+
+
+def verify_cache(pairs: list, periods: int, cache_dir: str, arima_engine: str = "sarimax",
+                 fit_timeout: Optional[float] = None, interval: float = 0.95) -> int:
+    """
+    Second pass over the warmed series, forecast like predict.forecast_state, in this process
+    against the cache in cache_dir. Returns the number of cache misses, i.e. fits that a later
+    predict.py run would still have to do.
+    """
+    cache = FitCache(cache_dir)
+    set_fit_cache(cache)
+    try:
+        for _, series in pairs:
+            try:
+                choose_forecast_interval(series, periods=periods, alpha=1.0 - interval, arima_engine=arima_engine,
+                                         fit_timeout=fit_timeout)
+            except Exception:
+                pass  # series that cannot be forecast failed in the warm-up as well
+    finally:
+        set_fit_cache(None)
+    return cache.misses
+
+
+def warm(clean_csv: str, out_dir: str = "data/forecasts", periods: int = 5, processes: Optional[int] = None,
+         cache_dir: Optional[str] = None, arima_engine: str = "sarimax", fit_timeout: Optional[float] = None,
+         aggregate: bool = True, verify: bool = False, model_dir: Optional[str] = None) -> dict:
+    """Forecast every series of the cleaned panel into out_dir; returns a summary with timing."""
+    if model_dir and not cache_dir:
+        # update_many filters the parameters forecast_many leaves in the fit cache instead of refitting
+        cache_dir = os.path.join(model_dir, "fits")
+    kwargs = dict(out_dir=out_dir, periods=periods, processes=processes, cache_dir=cache_dir, arima_engine=arima_engine,
+                  fit_timeout=fit_timeout, aggregate=aggregate, verify=verify, model_dir=model_dir)
+    if not cache_dir:
+        return _warm(clean_csv, **kwargs)
+    # set before the pool starts so every worker opens the same cache, and restored afterwards:
+    # callers such as process_data.py --warm keep running in this process with their own settings
+    previous_dir = os.environ.get("FORECAST_CACHE_DIR")
+    previous_cache = get_fit_cache()
+    os.environ["FORECAST_CACHE_DIR"] = cache_dir
+    set_fit_cache(None)  # inline runs open the warm-up cache on first use
+    try:
+        return _warm(clean_csv, **kwargs)
+    finally:
+        if previous_dir is None:
+            os.environ.pop("FORECAST_CACHE_DIR", None)
+        else:
+            os.environ["FORECAST_CACHE_DIR"] = previous_dir
+        set_fit_cache(previous_cache)
+
+
+def _warm(clean_csv: str, out_dir: str, periods: int, processes: Optional[int], cache_dir: Optional[str],
+          arima_engine: str, fit_timeout: Optional[float], aggregate: bool, verify: bool,
+          model_dir: Optional[str]) -> dict:
+    t0 = time.perf_counter()
+    df = pd.read_csv(clean_csv)
+    if aggregate:
+        df = with_aggregate(df)
+    keys = panel_keys(df)
+    pairs = split_panel(df)
+    logging.info("Warming %d series from %s (read in %.1fs)", len(pairs), clean_csv, time.perf_counter() - t0)
+
+    step = max(1, len(pairs) // 20)
+
+    def progress(done: int, total: int):
+        if done % step == 0 or done == total:
+            elapsed = time.perf_counter() - t0
+            logging.info("Fitted %d/%d series (%.0f%%), %.1fs elapsed", done, total, 100.0 * done / total, elapsed)
+
+    t_fit = time.perf_counter()
+    batch = forecast_many(df, periods=periods, processes=processes, arima_engine=arima_engine,
+                          fit_timeout=fit_timeout, alpha=DEFAULT_ALPHA, as_batch=True, progress=progress)
+    fit_seconds = time.perf_counter() - t_fit
+
+    os.makedirs(out_dir, exist_ok=True)
+    t_write = time.perf_counter()
+    written = 0
+    for key, history in pairs:
+        try:
+            f = batch.get(key)
+        except KeyError:
+            continue  # failed series are logged by forecast_many
+        n = len(f["years"])
+        frame = pd.DataFrame({
+            "year": np.concatenate([history.index.values, f["years"]]),
+            "value": np.concatenate([history.values, f["mean"]]),
+            "type": ["history"] * len(history) + ["forecast"] * n,
+            "lower": np.concatenate([np.full(len(history), np.nan), f["lower"]]),
+            "upper": np.concatenate([np.full(len(history), np.nan), f["upper"]]),
+            # last: method names contain commas (see predict.forecast_state)
+            "method": [""] * len(history) + [f["method"]] * n,
+        })
+        write_csv_atomic(frame, os.path.join(out_dir, forecast_filename(key, keys)))
+        written += 1
+
+    total = time.perf_counter() - t0
+    summary = {
+        "series": len(pairs),
+        "written": written,
+        "failed": len(pairs) - written,
+        "timed_out": len(batch.attrs.get("timed_out", [])),
+        "routes": batch.attrs.get("routes", {}),
+        "fit_seconds": round(fit_seconds, 3),
+        "write_seconds": round(time.perf_counter() - t_write, 3),
+        "total_seconds": round(total, 3),
+        "series_per_sec": round(len(pairs) / fit_seconds, 1) if fit_seconds > 0 else None,
+    }
+    if model_dir:
+        t_models = time.perf_counter()
+        refreshed = update_many(df, ModelStore(model_dir), periods=periods, processes=processes, arima_engine=arima_engine,
+                                fit_timeout=fit_timeout)
+        summary["models"] = refreshed.attrs.get("status", {})
+        summary["model_seconds"] = round(time.perf_counter() - t_models, 3)
+    if verify:
+        if not cache_dir:
+            raise ValueError("verify needs a cache_dir to check against.")
+        summary["verify_fits"] = verify_cache(pairs, periods, cache_dir, arima_engine=arima_engine, fit_timeout=fit_timeout)
+        if summary["verify_fits"]:
+            logging.warning("Verification pass refitted %d series: the cache does not cover predict.py runs.",
+                            summary["verify_fits"])
+    logging.info("Cache warm-up done: %s", summary)
+    return summary
+
+
+def main(args):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    summary = warm(args.clean, out_dir=args.out, periods=args.periods, processes=args.processes,
+                   cache_dir=args.cache_dir, arima_engine=args.arima_engine, fit_timeout=args.fit_timeout,
+                   aggregate=not args.no_aggregate, verify=args.verify,
+                   model_dir=args.model_dir or os.environ.get("FORECAST_MODEL_DIR"))
+    print(summary)
+    if summary.get("verify_fits"):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute all served forecasts after a data refresh.")
+    parser.add_argument("--clean", default="data/processed/cleaned_groundwater.csv", help="Cleaned CSV created by process_data.py")
+    parser.add_argument("--out", default="data/forecasts", help="Forecast directory served by serve_forecasts.py.")
+    parser.add_argument("--periods", type=int, default=5, help="Default forecast horizon to precompute.")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--cache-dir", default=None, help="Also fill the ARIMA fit cache in this directory.")
+    parser.add_argument("--arima-engine", default="sarimax", choices=("sarimax", "css"), help="ARIMA estimator.")
+    parser.add_argument("--fit-timeout", type=float, default=None, help="Seconds allowed per SARIMAX fit.")
+    parser.add_argument("--verify", action="store_true", help="With --cache-dir: check that a second run does no fits (exit 1 if it does).")
+    parser.add_argument("--model-dir", default=None, help="Also store each series' model state here for serve_forecasts.py ?periods=N.")
+    parser.add_argument("--no-aggregate", action="store_true", help="Skip the All States (Aggregate) series.")
+    args = parser.parse_args()
+    main(args)